@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- Konfigurasi Cache Jawaban Semantik untuk /api/chat ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity minimum
+
+_lock = threading.Lock()
+_matrix = None                 # (ANSWER_CACHE_MAX_ENTRIES, dim) embedding query yang dinormalisasi
+_valid = None                  # bool per slot
+_expires = None                # waktu kedaluwarsa per slot (detik epoch)
+_entries = OrderedDict()       # slot -> {"answer", "query", "expires_at"}; urutan = LRU
+_generation = 0                # naik setiap invalidasi; jawaban dari generasi lama tidak disimpan
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def current_generation():
+    """Generasi cache saat ini; simpan sebelum retrieval lalu berikan ke store()."""
+    return _generation
+
+
+def lookup(query_vector):
+    """Mengembalikan jawaban tersimpan untuk query yang mirip, atau None."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    q = _normalize(query_vector)
+    with _lock:
+        if not _entries:
+            return None
+        # Buang slot kedaluwarsa sebelum argmax agar tidak menutupi slot valid yang juga cocok
+        for slot in np.flatnonzero(_valid & (_expires < time.time())):
+            del _entries[int(slot)]
+            _valid[slot] = False
+        similarities = _matrix @ q
+        similarities[~_valid] = -np.inf
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < ANSWER_CACHE_THRESHOLD:
+            return None
+        _entries.move_to_end(slot)
+        return _entries[slot]["answer"]
+
+
+def store(query_vector, query, answer, generation):
+    """Menyimpan jawaban akhir; slot yang paling lama tidak dipakai dibuang jika penuh."""
+    global _matrix, _valid, _expires
+    if not ANSWER_CACHE_ENABLED or not answer:
+        return
+    q = _normalize(query_vector)
+    with _lock:
+        if generation != _generation:
+            return
+        if _matrix is None or _matrix.shape[1] != q.shape[0]:
+            _matrix = np.zeros((ANSWER_CACHE_MAX_ENTRIES, q.shape[0]), dtype=np.float32)
+            _valid = np.zeros(ANSWER_CACHE_MAX_ENTRIES, dtype=bool)
+            _expires = np.zeros(ANSWER_CACHE_MAX_ENTRIES, dtype=np.float64)
+            _entries.clear()
+
+        if len(_entries) >= ANSWER_CACHE_MAX_ENTRIES:
+            slot, _ = _entries.popitem(last=False)
+        else:
+            slot = int(np.argmin(_valid))
+        _matrix[slot] = q
+        _valid[slot] = True
+        expires_at = time.time() + ANSWER_CACHE_TTL_SECONDS
+        _expires[slot] = expires_at
+        _entries[slot] = {"answer": answer, "query": query, "expires_at": expires_at}
+
+
+def clear(*_args):
+    """Mengosongkan cache. Dipanggil oleh invalidate_cache() dan setiap perubahan data pengetahuan."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+        if _valid is not None:
+            _valid[:] = False
@@ -1,6 +1,6 @@
 import os
 import datetime
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 from langchain_core.documents import Document
@@ -57,10 +57,47 @@ def init_db():
         database.memory_bank.create_index([("question", ASCENDING)], unique=True)
         database.memory_bank.create_index([("saved_at", DESCENDING)])
         database.bug_reports.create_index([("reported_at", DESCENDING)])
+        database.jobs.create_index([("created_at", DESCENDING)])
         print(f"MongoDB initialized. Connected to database: {DB_NAME}")
     except Exception as e:
         print(f"Failed to create MongoDB indexes: {e}")
 
+# --- CHANGE LISTENERS (cache/indeks yang bergantung pada data pengetahuan) ---
+
+KNOWLEDGE_COLLECTIONS = ("memory_bank", "manual_data", "scraped_data")
+
+_change_listeners = []
+_watch_client = None
+
+def register_change_listener(listener):
+    """Register listener(collection, operation, item_id) yang dipanggil setelah data pengetahuan berubah."""
+    _change_listeners.append(listener)
+
+def _notify_change(collection, operation, item_id=None):
+    for listener in list(_change_listeners):
+        try:
+            listener(collection, operation, item_id)
+        except Exception as e:
+            print(f"Error in change listener: {e}")
+
+def watch_knowledge_changes(resume_after=None):
+    """Change stream MongoDB untuk koleksi pengetahuan (hanya tersedia di replica set / Atlas).
+
+    Memakai client terpisah tanpa socketTimeoutMS 500ms milik get_db(), karena getMore
+    change stream sengaja menunggu event baru. Melempar PyMongoError jika tidak didukung.
+    """
+    global _watch_client
+    if get_db() is None:
+        return None
+    if _watch_client is None:
+        _watch_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000, connectTimeoutMS=2000)
+    # watch() langsung menjalankan aggregate $changeStream; server standalone menolaknya di sini
+    return _watch_client[DB_NAME].watch(
+        [{"$match": {"ns.coll": {"$in": list(KNOWLEDGE_COLLECTIONS)}}}],
+        resume_after=resume_after,
+        max_await_time_ms=1000
+    )
+
 def _format_doc(doc):
     """Helper to convert ObjectId to string and format dates."""
     if not doc:
@@ -84,11 +121,14 @@ def add_manual_data(source_name, title, content, file_path=None):
     if file_path:
         data["file_path"] = file_path
     try:
-        database.manual_data.replace_one(
+        saved = database.manual_data.find_one_and_replace(
             {"source_name": source_name}, 
             data, 
-            upsert=True
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
+        _notify_change("manual_data", "upsert", str(saved["_id"]))
     except Exception as e:
         print(f"Error adding manual data: {e}")
 
@@ -107,36 +147,41 @@ def update_manual_data(item_id, title, content):
         {"_id": ObjectId(item_id)},
         {"$set": {"title": title, "content": content}}
     )
+    _notify_change("manual_data", "update", item_id)
 
 def delete_manual_data(item_id):
     database = get_db()
     if not database:
         return
     database.manual_data.delete_one({"_id": ObjectId(item_id)})
+    _notify_change("manual_data", "delete", item_id)
+
+# Fungsi *_documents_for_indexing adalah generator: record dibaca dari cursor satu per satu,
+# sehingga reindex korpus besar tidak perlu memuat semua dokumen ke RAM sekaligus.
 
-def get_manual_text_documents_for_indexing():
+def _ids_filter(ids):
+    """Filter opsional untuk indexing parsial: hanya record dengan ID tertentu."""
+    return {"_id": {"$in": [ObjectId(item_id) for item_id in ids]}} if ids is not None else {}
+
+def get_manual_text_documents_for_indexing(ids=None):
     database = get_db()
-    documents = []
     if not database:
-        return documents
-    cursor = database.manual_data.find({"file_path": {"$exists": False}})
+        return
+    cursor = database.manual_data.find({"file_path": {"$exists": False}, **_ids_filter(ids)})
     for doc in cursor:
         page_content = f"Judul Informasi Teks: {doc['title']}\n\nKonten:\n{doc['content']}"
-        metadata = {"source": doc['source_name'], "title": doc['title'], "type": "Data Teks"}
-        documents.append(Document(page_content=page_content, metadata=metadata))
-    return documents
+        metadata = {"source": doc['source_name'], "title": doc['title'], "type": "Data Teks", "doc_id": str(doc['_id'])}
+        yield Document(page_content=page_content, metadata=metadata)
 
-def get_document_documents_for_indexing():
+def get_document_documents_for_indexing(ids=None):
     database = get_db()
-    documents = []
     if not database:
-        return documents
-    cursor = database.manual_data.find({"file_path": {"$exists": True}})
+        return
+    cursor = database.manual_data.find({"file_path": {"$exists": True}, **_ids_filter(ids)})
     for doc in cursor:
         page_content = f"Judul Dokumen: {doc['title']}\n\nIsi Dokumen:\n{doc['content']}"
-        metadata = {"source": doc['source_name'], "title": doc['title'], "type": "Data Dokumen"}
-        documents.append(Document(page_content=page_content, metadata=metadata))
-    return documents
+        metadata = {"source": doc['source_name'], "title": doc['title'], "type": "Data Dokumen", "doc_id": str(doc['_id'])}
+        yield Document(page_content=page_content, metadata=metadata)
 
 # --- CRUD FUNCTION: MEMORY BANK ---
 
@@ -150,11 +195,14 @@ def add_to_memory(question, answer):
         "saved_at": datetime.datetime.utcnow()
     }
     try:
-        database.memory_bank.replace_one(
+        saved = database.memory_bank.find_one_and_replace(
             {"question": question},
             data,
-            upsert=True
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
+        _notify_change("memory_bank", "upsert", str(saved["_id"]))
     except Exception as e:
         print(f"Error adding to memory: {e}")
 
@@ -173,52 +221,99 @@ def update_memory_data(item_id, question, answer):
         {"_id": ObjectId(item_id)},
         {"$set": {"question": question, "answer": answer}}
     )
+    _notify_change("memory_bank", "update", item_id)
 
 def delete_memory_data(item_id):
     database = get_db()
     if not database:
         return
     database.memory_bank.delete_one({"_id": ObjectId(item_id)})
+    _notify_change("memory_bank", "delete", item_id)
 
-def get_memory_documents_for_indexing():
+def get_memory_documents_for_indexing(ids=None):
     database = get_db()
-    documents = []
     if not database:
-        return documents
-    cursor = database.memory_bank.find()
+        return
+    cursor = database.memory_bank.find(_ids_filter(ids))
     for doc in cursor:
         page_content = f"Pertanyaan: {doc['question']}\nJawaban Pasti: {doc['answer']}"
-        metadata = {"source": f"Memory Bank: {doc['question'][:50]}...", "title": doc['question'], "type": "Memory Bank"}
-        documents.append(Document(page_content=page_content, metadata=metadata))
-    return documents
+        metadata = {"source": f"Memory Bank: {doc['question'][:50]}...", "title": doc['question'], "type": "Memory Bank", "doc_id": str(doc['_id'])}
+        yield Document(page_content=page_content, metadata=metadata)
 
 # --- CRUD FUNCTION: SCRAPED DATA ---
 
-def add_scraped_data(url, title, content, image_url):
+def add_scraped_data(url, title, content, image_url, etag=None, last_modified=None, content_hash=None,
+                     body_hash=None, links=None):
+    """Menyimpan hasil scrape satu URL beserta validator HTTP-nya (ETag, Last-Modified, hash).
+
+    Jika content_hash sama dengan yang tersimpan, dokumen tidak ditulis ulang (scraped_at tetap,
+    indeks tidak disinkronkan); hanya validator yang diperbarui. Mengembalikan "new", "changed",
+    "unchanged", atau None jika MongoDB tidak tersedia/gagal.
+    """
     database = get_db()
     if not database:
-        return
-    data = {
-        "url": url,
-        "title": title,
-        "content": content,
-        "image_url": image_url,
-        "scraped_at": datetime.datetime.utcnow()
+        return None
+    # Hanya nilai yang diketahui: scrape dari file tidak membawa links, jadi links hasil crawl tetap disimpan
+    validators = {
+        key: value
+        for key, value in {"etag": etag, "last_modified": last_modified, "body_hash": body_hash, "links": links}.items()
+        if value is not None
     }
+    validators["checked_at"] = datetime.datetime.utcnow()
     try:
-        database.scraped_data.replace_one(
+        existing = database.scraped_data.find_one({"url": url}, {"content_hash": 1, "links": 1})
+        if existing and content_hash and existing.get("content_hash") == content_hash:
+            database.scraped_data.update_one({"_id": existing["_id"]}, {"$set": validators})
+            return "unchanged"
+        if existing and links is None and existing.get("links") is not None:
+            validators["links"] = existing["links"]
+        data = {
+            "url": url,
+            "title": title,
+            "content": content,
+            "image_url": image_url,
+            "content_hash": content_hash,
+            **validators,
+            "scraped_at": datetime.datetime.utcnow()
+        }
+        saved = database.scraped_data.find_one_and_replace(
             {"url": url},
             data,
-            upsert=True
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
+        _notify_change("scraped_data", "upsert", str(saved["_id"]))
+        return "changed" if existing else "new"
     except Exception as e:
         print(f"Error adding scraped data: {e}")
+        return None
+
+def mark_scraped_unchanged(url, etag=None, last_modified=None):
+    """Halaman tidak berubah (304 / hash body sama): hanya catat waktu cek dan validator terbaru."""
+    database = get_db()
+    if not database:
+        return
+    fields = {"checked_at": datetime.datetime.utcnow()}
+    if etag:
+        fields["etag"] = etag
+    if last_modified:
+        fields["last_modified"] = last_modified
+    database.scraped_data.update_one({"url": url}, {"$set": fields})
+
+def get_scraped_page_states():
+    """url -> validator tersimpan (etag, last_modified, body_hash, links) untuk request kondisional scraper."""
+    database = get_db()
+    if not database:
+        return {}
+    cursor = database.scraped_data.find({}, {"url": 1, "etag": 1, "last_modified": 1, "body_hash": 1, "links": 1, "_id": 0})
+    return {doc["url"]: doc for doc in cursor}
 
 def get_all_scraped_data():
     database = get_db()
     if not database:
         return []
-    cursor = database.scraped_data.find().sort("scraped_at", DESCENDING)
+    cursor = database.scraped_data.find({}, {"links": 0}).sort("scraped_at", DESCENDING)
     return [_format_doc(doc) for doc in cursor]
 
 def update_scraped_data(item_id, title, content):
@@ -229,25 +324,25 @@ def update_scraped_data(item_id, title, content):
         {"_id": ObjectId(item_id)},
         {"$set": {"title": title, "content": content}}
     )
+    _notify_change("scraped_data", "update", item_id)
 
 def delete_scraped_data(item_id):
     database = get_db()
     if not database:
         return
     database.scraped_data.delete_one({"_id": ObjectId(item_id)})
+    _notify_change("scraped_data", "delete", item_id)
 
-def get_scraped_documents_for_indexing():
+def get_scraped_documents_for_indexing(ids=None):
     database = get_db()
-    documents = []
     if not database:
-        return documents
-    cursor = database.scraped_data.find()
+        return
+    cursor = database.scraped_data.find(_ids_filter(ids))
     for doc in cursor:
         image_info = f"URL Gambar Terkait: {doc.get('image_url')}" if doc.get('image_url') else "Tidak ada gambar terkait."
         page_content = f"Judul Halaman: {doc['title']}\nURL: {doc['url']}\n{image_info}\n\nKonten:\n{doc['content']}"
-        metadata = {"source": doc['url'], "title": doc['title'], "type": "Data Scrap", "image_url": doc.get('image_url', '')}
-        documents.append(Document(page_content=page_content, metadata=metadata))
-    return documents
+        metadata = {"source": doc['url'], "title": doc['title'], "type": "Data Scrap", "image_url": doc.get('image_url', ''), "doc_id": str(doc['_id'])}
+        yield Document(page_content=page_content, metadata=metadata)
 
 # --- CRUD FUNCTION: BUG REPORTS ---
 
@@ -364,4 +459,69 @@ def get_memory_data_by_id(item_id):
     if not database:
         return None
     doc = database.memory_bank.find_one({"_id": ObjectId(item_id)})
-    return _format_doc(doc) if doc else None
\ No newline at end of file
+    return _format_doc(doc) if doc else None
+
+# --- BACKGROUND JOBS (reindex / scrape / crawl, lihat jobs.py) ---
+
+def create_job(job_id, job_type, params):
+    database = get_db()
+    if not database:
+        return
+    now = datetime.datetime.utcnow()
+    database.jobs.insert_one({
+        "_id": ObjectId(job_id),
+        "type": job_type,
+        "params": params,
+        "status": "queued",
+        "logs": [],
+        "log_count": 0,
+        "error": None,
+        "cancel_requested": False,
+        "created_at": now,
+        "updated_at": now,
+    })
+
+def update_job(job_id, fields=None, new_logs=None, log_limit=2000):
+    """Set field status dan tambahkan baris log baru (hanya log_limit baris terakhir yang disimpan)."""
+    database = get_db()
+    if not database:
+        return
+    update = {"$set": dict(fields or {}, updated_at=datetime.datetime.utcnow())}
+    if new_logs:
+        update["$push"] = {"logs": {"$each": new_logs, "$slice": -log_limit}}
+        update["$inc"] = {"log_count": len(new_logs)}
+    try:
+        database.jobs.update_one({"_id": ObjectId(job_id)}, update)
+    except Exception as e:
+        print(f"Error updating job {job_id}: {e}")
+
+def get_job_by_id(job_id):
+    database = get_db()
+    if not database or not ObjectId.is_valid(job_id):
+        return None
+    doc = database.jobs.find_one({"_id": ObjectId(job_id)})
+    return _format_doc(doc) if doc else None
+
+def get_recent_jobs(limit=20):
+    database = get_db()
+    if not database:
+        return []
+    cursor = database.jobs.find({}, {"logs": 0}).sort("created_at", DESCENDING).limit(limit)
+    return [_format_doc(doc) for doc in cursor]
+
+def request_job_cancel(job_id):
+    database = get_db()
+    if not database or not ObjectId.is_valid(job_id):
+        return False
+    result = database.jobs.update_one(
+        {"_id": ObjectId(job_id), "status": {"$in": ["queued", "running"]}},
+        {"$set": {"cancel_requested": True}}
+    )
+    return result.matched_count > 0
+
+def is_job_cancel_requested(job_id):
+    database = get_db()
+    if not database:
+        return False
+    doc = database.jobs.find_one({"_id": ObjectId(job_id)}, {"cancel_requested": 1})
+    return bool(doc and doc.get("cancel_requested"))
@@ -0,0 +1,79 @@
+import os
+import threading
+from contextlib import contextmanager
+from langchain_huggingface import HuggingFaceEmbeddings
+
+# --- Konfigurasi Model Embedding (dipakai bersama oleh indexing dan retrieval) ---
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = biarkan default torch
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", "0"))  # >1 = pool proses CPU khusus untuk reindex
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings():
+    """Mengembalikan satu instance HuggingFaceEmbeddings untuk seluruh proses.
+
+    Model dimuat secara lazy sekali saja (bukan per reindex / per invalidasi cache),
+    lalu di-warm-up dengan satu query agar request chat pertama tidak menanggung
+    biaya inisialisasi torch.
+    """
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+
+    with _embeddings_lock:
+        if _embeddings is None:
+            if EMBEDDING_THREADS > 0:
+                try:
+                    import torch
+                    torch.set_num_threads(EMBEDDING_THREADS)
+                except ImportError:
+                    pass
+            model = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL_NAME,
+                encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE},
+            )
+            model.embed_query("warmup")
+            print(f"Model embedding '{EMBEDDING_MODEL_NAME}' dimuat (batch={EMBEDDING_BATCH_SIZE}, threads={EMBEDDING_THREADS or 'default'}).")
+            _embeddings = model
+    return _embeddings
+
+
+def embed_documents(texts):
+    """Embed banyak teks sekaligus dengan ukuran batch EMBEDDING_BATCH_SIZE."""
+    return get_embeddings().embed_documents(list(texts))
+
+
+def embed_query(text):
+    """Embed satu query pencarian."""
+    return get_embeddings().embed_query(text)
+
+
+@contextmanager
+def document_encoder():
+    """Menyediakan encode(texts) -> list vektor untuk satu sesi indexing.
+
+    Jika EMBEDDING_PROCESSES > 1, pool proses sentence-transformers dibuat sekali untuk
+    seluruh sesi (bukan per batch) lalu dihentikan di akhir; selain itu memakai model
+    bersama di proses ini dengan jumlah thread torch EMBEDDING_THREADS.
+    """
+    model = get_embeddings()
+    client = getattr(model, "_client", None)
+    if EMBEDDING_PROCESSES <= 1 or client is None or not hasattr(client, "start_multi_process_pool"):
+        yield model.embed_documents
+        return
+
+    pool = client.start_multi_process_pool(target_devices=["cpu"] * EMBEDDING_PROCESSES)
+
+    def encode(texts):
+        # Praproses yang sama dengan HuggingFaceEmbeddings.embed_documents agar vektornya identik
+        texts = [text.replace("\n", " ") for text in texts]
+        return client.encode_multi_process(texts, pool, batch_size=EMBEDDING_BATCH_SIZE).tolist()
+
+    try:
+        yield encode
+    finally:
+        client.stop_multi_process_pool(pool)
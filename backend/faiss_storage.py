@@ -0,0 +1,237 @@
+import os
+import math
+import json
+import shutil
+import sqlite3
+import threading
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+
+# --- Format penyimpanan indeks FAISS ---
+# index.faiss     : vektor dalam format native FAISS, dibaca dengan IO_FLAG_MMAP saat serving
+#                   sehingga semua worker gunicorn berbagi page cache yang sama.
+# docstore.sqlite : isi dokumen + metadata (JSON) dan urutan posisi vektor -> ID dokumen.
+#                   Dibaca per baris sesuai kebutuhan, tanpa unpickle (tidak perlu allow_dangerous_deserialization).
+# index.flat.faiss: salinan flat presisi penuh, hanya ada jika index.faiss memakai factory
+#                   terkompresi/ANN. Indexing inkremental (add/delete) selalu bekerja di sini.
+INDEX_FILENAME = "index.faiss"
+MASTER_INDEX_FILENAME = "index.flat.faiss"
+DOCSTORE_FILENAME = "docstore.sqlite"
+LEGACY_PICKLE_FILENAME = "index.pkl"
+
+# Parameter pencarian untuk indeks IVF (nprobe) dan HNSW (efSearch) saat serving
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_TRAIN_SAMPLE_MAX = 100000
+_BUILD_BLOCK = 65536
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """Docstore LangChain yang disimpan di SQLite dan dimuat halaman demi halaman."""
+
+    def __init__(self, path, readonly=True):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS positions (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL)")
+        # Pencarian paralel (retrieval multi-sumber) memakai koneksi yang sama dari beberapa thread
+        self._lock = threading.Lock()
+
+    def search(self, search):
+        with self._lock:
+            row = self._conn.execute("SELECT page_content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs (id, page_content, metadata) VALUES (?, ?, ?)",
+                [(doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str)) for doc_id, doc in texts.items()],
+            )
+
+    def delete(self, ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def copy_range(self, source_path, start, end, offset):
+        """Menyalin dokumen berkunci posisi [start, end) dari docstore lain, kuncinya digeser offset."""
+        with self._lock:
+            self._conn.commit()  # ATTACH tidak boleh di dalam transaksi
+            self._conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO docs (id, page_content, metadata) "
+                    "SELECT CAST(CAST(id AS INTEGER) + ? AS TEXT), page_content, metadata FROM src.docs "
+                    "WHERE CAST(id AS INTEGER) >= ? AND CAST(id AS INTEGER) < ?",
+                    (offset, start, end),
+                )
+                self._conn.commit()
+            finally:
+                self._conn.execute("DETACH DATABASE src")
+
+    def load_positions(self):
+        with self._lock:
+            return {position: doc_id for position, doc_id in self._conn.execute("SELECT position, doc_id FROM positions")}
+
+    def save_positions(self, index_to_docstore_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM positions")
+            self._conn.executemany("INSERT INTO positions (position, doc_id) VALUES (?, ?)", list(index_to_docstore_id.items()))
+
+    def close(self, commit=True):
+        with self._lock:
+            if commit and not self.readonly:
+                self._conn.commit()
+            self._conn.close()
+
+
+def _read_index_mmap(index_file):
+    """Baca indeks dengan memory-map; jatuh ke pembacaan biasa jika tipe indeks tidak mendukung mmap."""
+    try:
+        return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except Exception:
+        return faiss.read_index(index_file)
+
+
+def _apply_search_params(index):
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", FAISS_NPROBE), ("efSearch", FAISS_HNSW_EF_SEARCH)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except Exception:
+            pass  # parameter tidak berlaku untuk tipe indeks ini (mis. Flat)
+
+
+def load_store(index_path, embeddings, writable=False, master=False):
+    """Memuat indeks dari index_path, atau None jika belum ada.
+
+    writable=False (serving): vektor di-mmap dan docstore SQLite dibuka read-only.
+    writable=True (indexing): vektor dibaca ke memori dan docstore disalin ke file .tmp,
+    sehingga pembaca yang sedang berjalan tetap melihat generasi lama sampai save_store().
+    writable/master=True memakai salinan flat presisi penuh jika indeks serving terkompresi.
+    ValueError jika jumlah vektor tidak sama dengan jumlah posisi di docstore (penulisan terputus).
+    Indeks format lama (index.pkl) masih dapat dibaca dan dikonversi saat ditulis ulang.
+    """
+    index_file = os.path.join(index_path, INDEX_FILENAME)
+    master_file = os.path.join(index_path, MASTER_INDEX_FILENAME)
+    docstore_file = os.path.join(index_path, DOCSTORE_FILENAME)
+
+    if os.path.exists(index_file) and os.path.exists(docstore_file):
+        if (writable or master) and os.path.exists(master_file):
+            index_file = master_file
+        if writable:
+            shutil.copyfile(docstore_file, docstore_file + ".tmp")
+            docstore = SQLiteDocstore(docstore_file + ".tmp", readonly=False)
+            index = faiss.read_index(index_file)
+        else:
+            docstore = SQLiteDocstore(docstore_file, readonly=True)
+            index = _read_index_mmap(index_file)
+            _apply_search_params(index)
+        positions = docstore.load_positions()
+        if index.ntotal != len(positions):
+            # save_store() terhenti di antara os.replace: file vektor dan docstore dari generasi berbeda
+            docstore.close(commit=False)
+            if writable:
+                os.remove(docstore.path)
+            raise ValueError(f"indeks tidak konsisten ({index.ntotal} vektor, {len(positions)} posisi di docstore)")
+        return FAISS(embeddings, index, docstore, positions)
+
+    if os.path.exists(os.path.join(index_path, LEGACY_PICKLE_FILENAME)):
+        legacy = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        if not writable:
+            return legacy
+        docstore = _fresh_docstore(docstore_file + ".tmp")
+        docstore.add({doc_id: legacy.docstore.search(doc_id) for doc_id in legacy.index_to_docstore_id.values()})
+        return FAISS(embeddings, legacy.index, docstore, dict(legacy.index_to_docstore_id))
+
+    return None
+
+
+def _fresh_docstore(path):
+    if os.path.exists(path):
+        os.remove(path)
+    return SQLiteDocstore(path, readonly=False)
+
+
+def new_store(index_path, embeddings, dimension):
+    """Indeks kosong (IndexFlatL2) siap ditulis, dengan docstore SQLite baru."""
+    os.makedirs(index_path, exist_ok=True)
+    docstore = _fresh_docstore(os.path.join(index_path, DOCSTORE_FILENAME) + ".tmp")
+    return FAISS(embeddings, faiss.IndexFlatL2(dimension), docstore, {})
+
+
+def build_serving_index(master, factory):
+    """Membangun indeks FAISS dari string factory (mis. "IVF{nlist},PQ16", "HNSW32", "SQ8")
+    berisi vektor indeks flat `master` dengan urutan posisi yang sama.
+
+    {nlist} diganti 4*sqrt(N). Pelatihan memakai sampel acak maksimal FAISS_TRAIN_SAMPLE_MAX
+    vektor, lalu vektor ditambahkan per blok agar memori tetap terbatas.
+    """
+    ntotal = master.ntotal
+    index = faiss.index_factory(master.d, factory.format(nlist=max(1, int(4 * math.sqrt(ntotal)))))
+    if not index.is_trained:
+        sample = np.sort(np.random.default_rng(0).choice(ntotal, size=min(ntotal, FAISS_TRAIN_SAMPLE_MAX), replace=False))
+        index.train(master.reconstruct_batch(sample))
+    for start in range(0, ntotal, _BUILD_BLOCK):
+        index.add(master.reconstruct_n(start, min(_BUILD_BLOCK, ntotal - start)))
+    return index
+
+
+def save_store(store, index_path, factory=None, train_threshold=0):
+    """Menulis indeks + docstore (tulis .tmp lalu os.replace per file; load_store() menolak
+    pasangan yang tidak cocok jika proses terhenti di antaranya).
+
+    Jika factory diberikan (selain "Flat") dan jumlah vektor >= train_threshold, index.faiss
+    berisi indeks hasil factory dan versi flat disimpan sebagai index.flat.faiss.
+    Mengembalikan tipe indeks serving yang ditulis.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    index_file = os.path.join(index_path, INDEX_FILENAME)
+    master_file = os.path.join(index_path, MASTER_INDEX_FILENAME)
+    docstore_file = os.path.join(index_path, DOCSTORE_FILENAME)
+
+    kind = "Flat"
+    if factory and factory != "Flat" and store.index.ntotal >= train_threshold:
+        kind = factory
+        faiss.write_index(store.index, master_file + ".tmp")
+        faiss.write_index(build_serving_index(store.index, factory), index_file + ".tmp")
+    else:
+        faiss.write_index(store.index, index_file + ".tmp")
+    store.docstore.save_positions(store.index_to_docstore_id)
+    store.docstore.close(commit=True)
+    os.replace(index_file + ".tmp", index_file)
+    if os.path.exists(master_file + ".tmp"):
+        os.replace(master_file + ".tmp", master_file)
+    elif os.path.exists(master_file):
+        os.remove(master_file)
+    os.replace(store.docstore.path, docstore_file)
+
+    legacy_file = os.path.join(index_path, LEGACY_PICKLE_FILENAME)
+    if os.path.exists(legacy_file):
+        os.remove(legacy_file)
+    return kind
+
+
+def discard_store(store):
+    """Membuang perubahan store writable yang belum disimpan."""
+    docstore = getattr(store, "docstore", None)
+    if isinstance(docstore, SQLiteDocstore) and not docstore.readonly:
+        docstore.close(commit=False)
+        if os.path.exists(docstore.path):
+            os.remove(docstore.path)
+
+
+def close_store(store):
+    """Menutup koneksi docstore SQLite read-only milik store yang tidak dipakai lagi."""
+    docstore = getattr(store, "docstore", None)
+    if isinstance(docstore, SQLiteDocstore) and docstore.readonly:
+        docstore.close(commit=False)
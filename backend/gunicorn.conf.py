@@ -0,0 +1,23 @@
+import os
+
+# Dibaca otomatis oleh gunicorn saat dijalankan dari folder backend (lihat Procfile).
+# SERVING_MODE=async -> worker gevent: request chat yang menunggu LLM tidak memegang thread.
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+
+if os.getenv("SERVING_MODE", "gthread").lower() == "async":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GEVENT_WORKER_CONNECTIONS", "500"))
+else:
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+
+def post_fork(server, worker):
+    # Library Google berbasis gRPC harus dibuat kooperatif secara eksplisit di bawah gevent
+    if worker_class == "gevent":
+        try:
+            import grpc.experimental.gevent as grpc_gevent
+            grpc_gevent.init_gevent()
+        except ImportError:
+            pass
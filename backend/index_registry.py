@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from serving import get_executor, run_blocking
+
+# --- Registry indeks berversi: generasi baru dimuat di latar belakang lalu ditukar secara atomik ---
+# Setiap reindex/hapus indeks menulis token baru ke file generasi. Setiap worker gunicorn memeriksa
+# file itu paling sering sekali per INDEX_RELOAD_CHECK_SECONDS; jika tokennya berubah, generasi baru
+# dimuat di pool thread sementara generasi lama tetap melayani chat sampai pertukaran.
+INDEX_GENERATION_FILE = "db/index_generation"
+INDEX_RELOAD_CHECK_SECONDS = float(os.getenv("INDEX_RELOAD_CHECK_SECONDS", "1.0"))
+
+
+def read_generation(path=INDEX_GENERATION_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def bump_generation(path=INDEX_GENERATION_FILE):
+    """Menandai bahwa indeks di disk berubah; semua worker akan memuat generasi baru."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    token = str(time.time_ns())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+    return token
+
+
+class IndexRegistry:
+    """Memegang satu generasi indeks yang sedang dipakai dan menukarnya tanpa jeda dingin.
+
+    loader()  : fungsi yang memuat indeks dari disk dan mengembalikan datanya.
+    on_swap() : dipanggil setelah generasi baru dipasang (mis. mengosongkan cache jawaban).
+
+    Hanya pemuatan pertama (belum ada generasi sama sekali) yang dilakukan secara sinkron,
+    dan itu pun oleh satu pemanggil saja; pemanggil lain menunggu hasil yang sama.
+    Pemuatan berikutnya berjalan di latar belakang dan dipasang oleh request berikutnya,
+    sehingga tidak ada thundering herd setelah reindex.
+    """
+
+    def __init__(self, loader, generation_file=INDEX_GENERATION_FILE, on_swap=None):
+        self._loader = loader
+        self._generation_file = generation_file
+        self._on_swap = on_swap
+        self._lock = threading.Lock()
+        self._current = None        # (token, data)
+        self._pending = None        # (token, future) generasi yang sedang dimuat
+        self._failed_token = None   # token yang gagal dimuat; tidak dicoba lagi sampai token berubah
+        self._next_check = 0.0
+
+    def get(self):
+        """Data generasi yang sedang aktif (memicu pemuatan latar belakang jika ada generasi baru)."""
+        current = self._current
+        if current is not None and self._pending is None and time.monotonic() < self._next_check:
+            return current[1]
+        with self._lock:
+            if self._current is None:
+                token = read_generation(self._generation_file)
+                self._install(token, run_blocking(self._loader))
+            else:
+                self._poll()
+            return self._current[1]
+
+    def request_reload(self):
+        """Tulis generasi baru dan periksa segera pada get() berikutnya di worker ini."""
+        bump_generation(self._generation_file)
+        self._next_check = 0.0
+
+    def _poll(self):
+        if self._pending is not None:
+            token, future = self._pending
+            if not future.done():
+                return
+            self._pending = None
+            try:
+                self._install(token, future.result())
+            except Exception as e:
+                print(f"Peringatan: Gagal memuat generasi indeks {token}, generasi lama tetap dipakai: {e}")
+                self._failed_token = token
+
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + INDEX_RELOAD_CHECK_SECONDS
+        token = read_generation(self._generation_file)
+        if token != self._current[0] and token != self._failed_token:
+            # Token dibaca sebelum memuat: jika ada reindex lagi selama pemuatan, pemeriksaan berikutnya memuat ulang
+            self._pending = (token, get_executor().submit(self._loader))
+
+    def _install(self, token, data):
+        self._current = (token, data)
+        self._failed_token = None
+        if self._on_swap is not None:
+            self._on_swap()
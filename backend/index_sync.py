@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+import jobs
+from vector_store import sync_indexes
+from database import KNOWLEDGE_COLLECTIONS, watch_knowledge_changes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# --- Sinkronisasi indeks otomatis setelah data pengetahuan berubah ---
+# "auto"  : change stream MongoDB jika tersedia (replica set / Atlas), selain itu antrian write-behind
+#           yang diisi oleh fungsi CRUD di database.py. "queue" = selalu antrian, "off" = nonaktif
+#           (indeks hanya diperbarui lewat tombol Rebuild Index).
+# Perubahan digabung per koleksi lalu diterapkan sebagai job "sync" berukuran kecil: hanya record
+# yang berubah yang di-embed ulang, dan job baru berjalan setelah job scrape/crawl/reindex selesai.
+INDEX_SYNC_MODE = os.getenv("INDEX_SYNC_MODE", "auto").lower()
+INDEX_SYNC_DELAY_SECONDS = float(os.getenv("INDEX_SYNC_DELAY_SECONDS", "2.0"))  # jeda untuk menggabungkan burst perubahan
+# Dengan change stream hanya satu worker per host yang membaca stream (flock pada file ini)
+INDEX_SYNC_LEADER_LOCK_FILE = "db/index_sync.lock"
+LEADER_RETRY_SECONDS = 30
+STREAM_RETRY_SECONDS = 5
+
+_lock = threading.Lock()
+_pending = {}           # koleksi -> set ID record, atau None = seluruh koleksi
+_sync_job_id = None
+_use_change_stream = False
+_leader_lock_file = None
+
+
+def enqueue(collection, item_id=None):
+    """Catat perubahan satu record (atau seluruh koleksi jika item_id None) dan jadwalkan job sync."""
+    global _sync_job_id
+    if INDEX_SYNC_MODE == "off" or collection not in KNOWLEDGE_COLLECTIONS:
+        return
+    with _lock:
+        if item_id is None or _pending.get(collection, set()) is None:
+            _pending[collection] = None
+        else:
+            _pending.setdefault(collection, set()).add(str(item_id))
+        if _sync_job_id is None or not jobs.is_active(_sync_job_id):
+            _sync_job_id, _ = jobs.submit("sync")
+
+
+def on_change(collection, operation, item_id=None):
+    """Listener perubahan data (database.register_change_listener) untuk mode antrian."""
+    if not _use_change_stream:
+        enqueue(collection, item_id)
+
+
+def _describe(batch):
+    return ", ".join(
+        f"{collection}: {'semua' if ids is None else len(ids)}" for collection, ids in sorted(batch.items())
+    )
+
+
+def _sync_job(params):
+    """Mengosongkan antrian perubahan berulang kali sampai tidak ada perubahan baru."""
+    batch, finished = {}, False
+    try:
+        while True:
+            time.sleep(INDEX_SYNC_DELAY_SECONDS)
+            with _lock:
+                batch = dict(_pending)
+                _pending.clear()
+                if not batch:
+                    finished = True
+                    return
+            yield f"Sinkronisasi indeks untuk perubahan ({_describe(batch)})...\n"
+            yield from sync_indexes(batch)
+            batch = {}
+    finally:
+        if not finished and batch:
+            # Dibatalkan/gagal di tengah batch: kembalikan ke antrian untuk job sync berikutnya
+            with _lock:
+                for collection, ids in batch.items():
+                    if ids is None or _pending.get(collection, set()) is None:
+                        _pending[collection] = None
+                    else:
+                        _pending.setdefault(collection, set()).update(ids)
+
+
+def _after_sync_job(job_id, status):
+    """Perubahan yang masuk saat job sync sedang selesai tertahan di _pending karena submit()
+    masih memakai ulang job itu; setelah statusnya final, jadwalkan job sync baru untuknya."""
+    global _sync_job_id
+    with _lock:
+        if _sync_job_id not in (None, job_id):
+            return
+        _sync_job_id = None
+        # Job yang dibatalkan/gagal tidak diulang otomatis; antriannya ikut job sync berikutnya
+        if status == "succeeded" and _pending:
+            _sync_job_id, _ = jobs.submit("sync")
+
+
+jobs.register_job_type("sync", _sync_job, on_finish=_after_sync_job)
+
+
+def _handle_change_event(change):
+    collection = change.get("ns", {}).get("coll")
+    operation = change.get("operationType")
+    if operation in ("insert", "update", "replace", "delete"):
+        enqueue(collection, str(change["documentKey"]["_id"]))
+    elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+        for name in ([collection] if collection else KNOWLEDGE_COLLECTIONS):
+            enqueue(name)
+
+
+def _try_become_leader():
+    global _leader_lock_file
+    if fcntl is None:
+        return True
+    os.makedirs(os.path.dirname(INDEX_SYNC_LEADER_LOCK_FILE), exist_ok=True)
+    lock_file = open(INDEX_SYNC_LEADER_LOCK_FILE, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _leader_lock_file = lock_file  # dipegang selama proses hidup
+    return True
+
+
+def _watch_loop(cursor):
+    while not _try_become_leader():
+        cursor.close()
+        cursor = None
+        time.sleep(LEADER_RETRY_SECONDS)
+    print("Index sync: worker ini membaca change stream MongoDB.")
+
+    resume_token = None
+    while True:
+        try:
+            if cursor is None:
+                cursor = watch_knowledge_changes(resume_after=resume_token)
+            for change in cursor:
+                _handle_change_event(change)
+                resume_token = cursor.resume_token
+        except Exception as e:
+            print(f"Index sync: change stream terputus ({e}), mencoba lagi dalam {STREAM_RETRY_SECONDS} detik.")
+            if cursor is not None:
+                cursor.close()
+            cursor = None
+            time.sleep(STREAM_RETRY_SECONDS)
+
+
+def start():
+    """Aktifkan sinkronisasi indeks otomatis sesuai INDEX_SYNC_MODE (dipanggil sekali saat startup)."""
+    global _use_change_stream
+    if INDEX_SYNC_MODE == "off":
+        return
+    if INDEX_SYNC_MODE == "auto":
+        try:
+            cursor = watch_knowledge_changes()
+        except Exception as e:
+            print(f"Index sync: change stream tidak tersedia ({e}), memakai antrian write-behind.")
+            cursor = None
+        if cursor is not None:
+            _use_change_stream = True
+            threading.Thread(target=_watch_loop, args=(cursor,), name="index-sync-watch", daemon=True).start()
@@ -0,0 +1,200 @@
+import os
+import time
+import datetime
+import threading
+from bson import ObjectId
+from serving import new_executor
+from database import create_job, update_job, get_job_by_id, get_recent_jobs, request_job_cancel, is_job_cancel_requested
+
+# --- Antrian job latar belakang untuk pekerjaan maintenance (reindex, scraping, crawling) ---
+# Job dijalankan satu per satu di thread OS khusus milik worker yang menerimanya, jadi tidak
+# memegang thread request dan tidak berhenti saat tab admin ditutup. Status dan log disimpan
+# ke koleksi MongoDB `jobs` agar bisa dipantau dari worker mana pun; tanpa MongoDB status
+# hanya tersedia di worker yang menjalankannya.
+JOB_LOG_LIMIT = int(os.getenv("JOB_LOG_LIMIT", "2000"))          # baris log terakhir yang disimpan per job
+JOB_FLUSH_SECONDS = float(os.getenv("JOB_FLUSH_SECONDS", "1.0"))  # interval tulis log + cek pembatalan
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))    # job aktif tanpa kabar selama ini dianggap hilang
+MAX_LOCAL_JOBS = 50
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_job_types = {}
+_finish_hooks = {}    # job_type -> callback(job_id, status) setelah job selesai
+_jobs = {}            # job_id -> job dict milik worker ini (sumber paling mutakhir)
+_lock = threading.Lock()
+_executor = None
+
+
+def register_job_type(job_type, runner, on_finish=None):
+    """runner(params) mengembalikan iterator baris log; job dibatalkan di antara dua baris.
+
+    on_finish(job_id, status) dipanggil setelah status akhir job tercatat, jadi submit() di
+    dalamnya membuat job baru alih-alih memakai ulang job yang sedang selesai.
+    """
+    _job_types[job_type] = runner
+    if on_finish is not None:
+        _finish_hooks[job_type] = on_finish
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # Satu thread: job maintenance tidak boleh saling tumpang tindih (mis. dua reindex)
+                _executor = new_executor(1)
+    return _executor
+
+
+def submit(job_type, params=None):
+    """Memasukkan job ke antrian. Job sejenis yang masih aktif di worker ini dipakai ulang.
+
+    Mengembalikan (job_id, created).
+    """
+    if job_type not in _job_types:
+        raise ValueError(f"Tipe job tidak dikenal: {job_type}")
+    params = params or {}
+    with _lock:
+        for job in _jobs.values():
+            if job["type"] == job_type and job["status"] in ACTIVE_STATUSES:
+                return job["id"], False
+        job_id = str(ObjectId())
+        _jobs[job_id] = {
+            "id": job_id,
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "logs": [],
+            "log_count": 0,
+            "error": None,
+            "cancel_requested": False,
+            "created_at": datetime.datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        _prune_local_jobs()
+    create_job(job_id, job_type, params)
+    _get_executor().submit(_run, job_id)
+    return job_id, True
+
+
+def _prune_local_jobs():
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] not in ACTIVE_STATUSES]
+    for job_id in finished[:max(0, len(_jobs) - MAX_LOCAL_JOBS)]:
+        del _jobs[job_id]
+
+
+def _append_logs(job, lines):
+    job["logs"].extend(lines)
+    job["log_count"] += len(lines)
+    if len(job["logs"]) > JOB_LOG_LIMIT:
+        del job["logs"][:len(job["logs"]) - JOB_LOG_LIMIT]
+
+
+def _cancel_requested(job):
+    if not job["cancel_requested"] and is_job_cancel_requested(job["id"]):
+        job["cancel_requested"] = True
+    return job["cancel_requested"]
+
+
+def _run(job_id):
+    job = _jobs[job_id]
+    if _cancel_requested(job):
+        _finish(job, "cancelled", [], "Job dibatalkan sebelum dimulai.")
+        return
+
+    job["status"] = "running"
+    job["started_at"] = datetime.datetime.utcnow()
+    update_job(job_id, {"status": "running", "started_at": job["started_at"]})
+
+    pending, last_flush = [], time.monotonic()
+    iterator = _job_types[job["type"]](job["params"])
+    try:
+        for output in iterator:
+            lines = [line for line in str(output).splitlines() if line.strip()]
+            _append_logs(job, lines)
+            pending.extend(lines)
+            if time.monotonic() - last_flush < JOB_FLUSH_SECONDS:
+                continue
+            update_job(job_id, new_logs=pending, log_limit=JOB_LOG_LIMIT)
+            pending, last_flush = [], time.monotonic()
+            if _cancel_requested(job):
+                iterator.close()
+                _finish(job, "cancelled", pending, "Job dibatalkan oleh admin.")
+                return
+        _finish(job, "succeeded", pending)
+    except Exception as e:
+        job["error"] = str(e)
+        _finish(job, "failed", pending, f"ERROR: {e}")
+
+
+def _finish(job, status, unflushed, message=None):
+    """Menandai job selesai; `unflushed` = baris log lokal yang belum ditulis ke MongoDB."""
+    if message:
+        _append_logs(job, [message])
+        unflushed = unflushed + [message]
+    job["status"] = status
+    job["finished_at"] = datetime.datetime.utcnow()
+    update_job(job["id"], {"status": status, "finished_at": job["finished_at"], "error": job["error"]},
+               new_logs=unflushed, log_limit=JOB_LOG_LIMIT)
+    hook = _finish_hooks.get(job["type"])
+    if hook is not None:
+        try:
+            hook(job["id"], status)
+        except Exception as e:
+            print(f"Peringatan: callback selesai job {job['type']} gagal: {e}")
+
+
+def is_active(job_id):
+    """True jika job milik worker ini masih antri atau berjalan."""
+    job = _jobs.get(job_id)
+    return job is not None and job["status"] in ACTIVE_STATUSES
+
+
+def cancel(job_id):
+    """Meminta pembatalan job; job berhenti pada baris log berikutnya. True jika job masih aktif."""
+    job = _jobs.get(job_id)
+    requested = request_job_cancel(job_id)
+    if job is not None and job["status"] in ACTIVE_STATUSES:
+        job["cancel_requested"] = True
+        return True
+    return requested
+
+
+def _public_view(job, since):
+    """Salinan job dengan log mulai dari nomor baris absolut `since`."""
+    logs = job.get("logs") or []
+    first_line = job.get("log_count", len(logs)) - len(logs)
+    view = {key: value for key, value in job.items() if key != "logs"}
+    view["logs"] = logs[max(0, since - first_line):]
+    view["next_since"] = job.get("log_count", len(logs))
+    return view
+
+
+def get(job_id, since=0):
+    """Status job + log baru sejak baris `since`, atau None jika job tidak dikenal."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        # Salin hitungan sebelum log: jika thread job menambah baris di antaranya, klien
+        # menerima duplikat, bukan kehilangan baris
+        snapshot = dict(job)
+        snapshot["logs"] = list(job["logs"])
+        return _public_view(snapshot, since)
+
+    job = get_job_by_id(job_id)
+    if job is None:
+        return None
+    # Worker pemilik job mati (restart/deploy) sebelum job selesai
+    updated_at = job.get("updated_at")
+    if job["status"] in ACTIVE_STATUSES and updated_at and \
+            (datetime.datetime.utcnow() - updated_at).total_seconds() > JOB_STALE_SECONDS:
+        job["status"] = "lost"
+    return _public_view(job, since)
+
+
+def list_recent(limit=20):
+    """Job terbaru (tanpa log), digabung dengan job lokal yang belum tersimpan di MongoDB."""
+    jobs = {job["id"]: job for job in get_recent_jobs(limit)}
+    for job_id, job in list(_jobs.items()):
+        jobs[job_id] = {key: value for key, value in job.items() if key != "logs"}
+    return sorted(jobs.values(), key=lambda job: job["created_at"], reverse=True)[:limit]
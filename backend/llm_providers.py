@@ -0,0 +1,333 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from dotenv import load_dotenv
+from serving import is_gevent_active
+from prompt_builder import estimate_tokens
+
+load_dotenv()
+
+# --- Penyedia LLM untuk jawaban akhir /api/chat ---
+# "auto"  : semua penyedia yang kredensialnya tersedia, dengan prioritas Vertex AI (GCP_PROJECT) ->
+#           Gemini API (GEMINI_API_KEY) -> Groq (GROQ_API_KEY); sisanya cadangan untuk failover.
+# Daftar dipisah koma (mis. "groq,gemini") menentukan penyedia dan urutannya sendiri; satu nama = tanpa cadangan.
+# "stub"  : LLM lokal deterministik untuk load test & benchmark: tanpa API key, tanpa kuota, dengan
+#           latensi, kecepatan token dan usage yang bisa diatur, jadi retrieval, penyusunan prompt,
+#           pencatatan token dan streaming tetap teruji pada konkurensi realistis.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "auto").lower()
+AUTO_PROVIDER_ORDER = ("vertex", "gemini", "groq")
+
+LLM_TEMPERATURE = 0.7
+LLM_MAX_OUTPUT_TOKENS = 2048
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3.7-flash")
+GEMINI_THINKING_LEVEL = os.getenv("GEMINI_THINKING_LEVEL", "MEDIUM").upper()
+GCP_PROJECT = os.getenv("GCP_PROJECT")
+GCP_LOCATION = os.getenv("GCP_LOCATION", "global")
+GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = "llama-3.1-8b-instant"
+
+# Koneksi HTTP ke penyedia LLM: klien dibuat sekali per proses dan memakai ulang pool keep-alive,
+# sehingga request chat tidak membayar TCP + TLS handshake lagi. HTTP/2 (multipleks banyak stream
+# jawaban di satu koneksi) aktif jika paket h2 terpasang.
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "120"))
+
+LLM_STUB_FIRST_TOKEN_MS = float(os.getenv("LLM_STUB_FIRST_TOKEN_MS", "300"))   # latensi sebelum token pertama
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "50"))  # 0 = tanpa jeda antar token
+LLM_STUB_ANSWER_TOKENS = int(os.getenv("LLM_STUB_ANSWER_TOKENS", "120"))         # panjang jawaban (token)
+STUB_WORDS = (
+    "sekolah siswa jurusan pendaftaran jadwal informasi kegiatan guru kelas praktik prestasi "
+    "ekstrakurikuler layanan dokumen persyaratan tahun ajaran laboratorium bengkel kompetensi"
+).split()
+
+if GOOGLE_APPLICATION_CREDENTIALS:
+    if not os.path.isabs(GOOGLE_APPLICATION_CREDENTIALS):
+        possible_paths = [
+            os.path.join(os.path.dirname(__file__), '..', GOOGLE_APPLICATION_CREDENTIALS),
+            os.path.join(os.path.dirname(__file__), GOOGLE_APPLICATION_CREDENTIALS)
+        ]
+        for p in possible_paths:
+            if os.path.exists(p):
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.abspath(p)
+                break
+
+
+def _history_texts(history):
+    """(role, teks) per pesan riwayat chat yang sudah divalidasi (format parts Gemini)."""
+    for msg in history:
+        yield msg['role'], " ".join([part['text'] for part in msg.get('parts', [])])
+
+
+def _usage(prompt, completion, total):
+    return {"prompt": prompt, "completion": completion, "total": total}
+
+
+def _httpx_client_args():
+    """Argumen httpx.Client bersama: batas pool keep-alive dan HTTP/2 jika tersedia."""
+    import httpx
+    http2 = LLM_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS,
+        ),
+    }
+
+
+class _Provider:
+    """Dasar penyedia LLM. Subkelas membangun klien/model/config sekali di __init__ dan
+    mengimplementasikan _stream(prompt, history)."""
+
+    name = None
+    model = None
+
+    def generate(self, prompt, history, stream=False):
+        """stream=True: iterator {"text": potongan} lalu (jika ada) satu {"usage": {...}}.
+        stream=False: {"text": jawaban lengkap, "usage": {...} atau None}."""
+        if stream:
+            return self._stream(prompt, history)
+        parts, usage = [], None
+        for chunk in self._stream(prompt, history):
+            if chunk.get("text"):
+                parts.append(chunk["text"])
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+        return {"text": "".join(parts), "usage": usage}
+
+    def _stream(self, prompt, history):
+        raise NotImplementedError
+
+
+class VertexProvider(_Provider):
+    """Gemini via Vertex AI (google-genai, kredensial GCP)."""
+
+    name = "vertex"
+
+    def __init__(self):
+        from google import genai as google_genai
+        from google.genai import types as genai_types
+        self.model = GEMINI_MODEL
+        try:
+            http_options = genai_types.HttpOptions(client_args=_httpx_client_args())
+        except Exception:
+            http_options = None  # google-genai lama: pool bawaan klien tetap dipakai ulang
+        self.client = google_genai.Client(vertexai=True, project=GCP_PROJECT, location=GCP_LOCATION,
+                                          http_options=http_options)
+        self.config = genai_types.GenerateContentConfig(
+            temperature=LLM_TEMPERATURE,
+            max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
+        )
+        if GEMINI_THINKING_LEVEL in ["LOW", "MEDIUM", "HIGH"]:
+            self.config.thinking_config = genai_types.ThinkingConfig(thinking_level=GEMINI_THINKING_LEVEL)
+        print(f"Vertex AI initialized for project '{GCP_PROJECT}' in region '{GCP_LOCATION}'")
+
+    @staticmethod
+    def is_configured():
+        return bool(GCP_PROJECT)
+
+    def _stream(self, prompt, history):
+        # Riwayat + pesan baru dikirim langsung; tidak perlu objek sesi chat per request
+        contents = [
+            {"role": "user" if role == "user" else "model", "parts": [{"text": content}]}
+            for role, content in _history_texts(history)
+        ]
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        usage_metadata = None
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=contents, config=self.config):
+            if chunk.text:
+                yield {"text": chunk.text}
+            if getattr(chunk, 'usage_metadata', None):
+                usage_metadata = chunk.usage_metadata
+        if usage_metadata:
+            yield {"usage": _usage(
+                getattr(usage_metadata, 'prompt_token_count', 0),
+                getattr(usage_metadata, 'candidates_token_count', 0),
+                getattr(usage_metadata, 'total_token_count', 0),
+            )}
+
+
+class GeminiProvider(_Provider):
+    """Gemini via Gemini API (google-generativeai, GEMINI_API_KEY)."""
+
+    name = "gemini"
+
+    def __init__(self):
+        import google.generativeai as genai
+        self.model = GEMINI_MODEL
+        # Di worker gevent (SERVING_MODE=async) pakai transport REST agar request ke Gemini kooperatif.
+        # Klien transport (channel gRPC / sesi REST) di-cache oleh google-generativeai setelah configure.
+        if is_gevent_active():
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest")
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+        self.gemini_model = genai.GenerativeModel(
+            self.model,
+            generation_config={
+                "temperature": LLM_TEMPERATURE,
+                "max_output_tokens": LLM_MAX_OUTPUT_TOKENS,
+            }
+        )
+
+    @staticmethod
+    def is_configured():
+        return bool(GEMINI_API_KEY)
+
+    def _stream(self, prompt, history):
+        contents = [
+            {"role": "user" if role == "user" else "model", "parts": [content]}
+            for role, content in _history_texts(history)
+        ]
+        contents.append({"role": "user", "parts": [prompt]})
+        response = self.gemini_model.generate_content(contents, stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield {"text": chunk.text}
+        if getattr(response, 'usage_metadata', None):
+            yield {"usage": _usage(
+                response.usage_metadata.prompt_token_count,
+                response.usage_metadata.candidates_token_count,
+                response.usage_metadata.total_token_count,
+            )}
+
+
+class GroqProvider(_Provider):
+    """Llama 3 via Groq (GROQ_API_KEY)."""
+
+    name = "groq"
+
+    def __init__(self):
+        from groq import Groq, DefaultHttpxClient
+        self.model = GROQ_MODEL
+        self.client = Groq(api_key=GROQ_API_KEY, http_client=DefaultHttpxClient(**_httpx_client_args()))
+
+    @staticmethod
+    def is_configured():
+        return bool(GROQ_API_KEY)
+
+    def _stream(self, prompt, history):
+        messages = [
+            {"role": "user" if role == "user" else "assistant", "content": content}
+            for role, content in _history_texts(history)
+        ]
+        messages.append({"role": "user", "content": prompt})
+
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            temperature=LLM_TEMPERATURE,
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            stream=True
+        )
+        usage = None
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield {"text": delta}
+            # Groq mengirim usage pada chunk terakhir (x_groq.usage)
+            x_groq = getattr(chunk, 'x_groq', None)
+            usage = getattr(chunk, 'usage', None) or (getattr(x_groq, 'usage', None) if x_groq else None) or usage
+        if usage:
+            yield {"usage": _usage(usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)}
+
+
+class StubProvider(_Provider):
+    """LLM lokal deterministik: jawaban yang sama untuk prompt yang sama, tanpa jaringan.
+
+    Menunggu LLM_STUB_FIRST_TOKEN_MS, lalu menyiarkan LLM_STUB_ANSWER_TOKENS kata dengan
+    kecepatan LLM_STUB_TOKENS_PER_SECOND. Token prompt diperkirakan dengan prompt_builder.estimate_tokens.
+    Menunggu memakai time.sleep, jadi kooperatif di bawah gevent seperti I/O penyedia asli.
+    """
+
+    name = "stub"
+
+    def __init__(self):
+        self.model = "stub"
+
+    @staticmethod
+    def is_configured():
+        return True
+
+    def _stream(self, prompt, history):
+        prompt_tokens = max(1, estimate_tokens(prompt) + sum(estimate_tokens(content) for _, content in _history_texts(history)))
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        words = [rng.choice(STUB_WORDS) for _ in range(LLM_STUB_ANSWER_TOKENS)]
+
+        time.sleep(LLM_STUB_FIRST_TOKEN_MS / 1000)
+        for i, word in enumerate(words):
+            if i and LLM_STUB_TOKENS_PER_SECOND > 0:
+                time.sleep(1 / LLM_STUB_TOKENS_PER_SECOND)
+            yield {"text": word if i == 0 else f" {word}"}
+        yield {"usage": _usage(prompt_tokens, len(words), prompt_tokens + len(words))}
+
+
+PROVIDERS = {
+    "vertex": VertexProvider,
+    "gemini": GeminiProvider,
+    "groq": GroqProvider,
+    "stub": StubProvider,
+}
+
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def _create_provider(name):
+    try:
+        return PROVIDERS[name]()
+    except Exception as e:
+        print(f"Warning: Failed to initialize LLM provider '{name}': {e}")
+        return None
+
+
+def _select_providers():
+    auto = LLM_PROVIDER == "auto"
+    if auto:
+        if not (GEMINI_API_KEY or GCP_PROJECT):
+            print("WARNING: Neither GEMINI_API_KEY nor GCP_PROJECT is configured properly.")
+        if not GROQ_API_KEY:
+            print("WARNING: GROQ_API_KEY environment variable is not set.")
+        names = AUTO_PROVIDER_ORDER
+    else:
+        names = [name.strip() for name in LLM_PROVIDER.split(",") if name.strip()]
+
+    providers = []
+    for name in names:
+        if name not in PROVIDERS:
+            print(f"WARNING: Penyedia LLM '{name}' tidak dikenal (pilihan: auto, {', '.join(PROVIDERS)}).")
+            continue
+        if not PROVIDERS[name].is_configured():
+            if not auto:
+                print(f"WARNING: Penyedia LLM '{name}' dipilih tetapi kredensialnya belum disetel.")
+            continue
+        provider = _create_provider(name)
+        if provider is not None:
+            providers.append(provider)
+    return providers
+
+
+def get_providers():
+    """Penyedia LLM sesuai LLM_PROVIDER, berurutan menurut prioritas (dibuat sekali per proses).
+
+    Setiap penyedia dibangun sekali (klien, model, config, pool koneksi) lalu dipakai semua request;
+    lihat _Provider.generate(prompt, history, stream=...) untuk format hasilnya.
+    Pemilihan penyedia per request (failover, hedging) ada di llm_router.py.
+    """
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                _providers = _select_providers()
+    return _providers
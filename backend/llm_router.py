@@ -0,0 +1,294 @@
+import os
+import time
+import queue
+import threading
+import llm_providers
+
+# --- Routing request LLM antar penyedia (lihat LLM_PROVIDER di llm_providers.py) ---
+# Setiap penyedia punya circuit breaker: setelah LLM_CIRCUIT_FAILURES kegagalan berturut-turut penyedia
+# dilewati selama LLM_CIRCUIT_OPEN_SECONDS, lalu dicoba lagi oleh satu request saja (half-open; request lain
+# tetap melewatinya sampai percobaan itu selesai; satu kegagalan membukanya lagi).
+# Penyedia yang gagal sebelum token pertama dialihkan otomatis ke penyedia berikutnya (failover).
+# Hedging (LLM_HEDGE_AFTER_MS > 0): jika penyedia pertama belum menghasilkan token dalam X ms, penyedia
+# berikutnya dijalankan bersamaan dan yang pertama menghasilkan token dipakai; yang lain dihentikan.
+# Urutan: "priority" = urutan LLM_PROVIDER, "latency" = EWMA latensi token pertama tercepat dulu.
+LLM_ROUTING = os.getenv("LLM_ROUTING", "priority").lower()
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "3"))
+LLM_CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))  # 0 = hedging nonaktif
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+
+
+def _ewma(previous, value):
+    return value if previous is None else LLM_EWMA_ALPHA * value + (1 - LLM_EWMA_ALPHA) * previous
+
+
+class ProviderHealth:
+    """Statistik satu penyedia di worker ini: EWMA latensi, kegagalan dan status circuit breaker."""
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self.first_token_ms = None   # EWMA latensi sampai token pertama
+        self.total_ms = None         # EWMA durasi jawaban lengkap
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.last_error = None
+        self.probe = None            # request yang sedang mencoba penyedia ini dalam keadaan half-open
+
+    def is_open(self, now):
+        """Terbuka selama masa jeda, dan selama half-open jika percobaan request lain masih berjalan."""
+        return self.consecutive_failures >= LLM_CIRCUIT_FAILURES and (now < self.open_until or self.probe is not None)
+
+    def record_success(self, first_token_seconds, total_seconds):
+        self.requests += 1
+        self.consecutive_failures = 0
+        if first_token_seconds is not None:
+            self.first_token_ms = _ewma(self.first_token_ms, first_token_seconds * 1000)
+        self.total_ms = _ewma(self.total_ms, total_seconds * 1000)
+
+    def record_failure(self, error):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)[:300]
+        if self.consecutive_failures >= LLM_CIRCUIT_FAILURES:
+            self.open_until = time.monotonic() + LLM_CIRCUIT_OPEN_SECONDS
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "name": self.name,
+            "model": self.model,
+            "circuit": "closed" if self.consecutive_failures < LLM_CIRCUIT_FAILURES else
+                       ("open" if now < self.open_until else "half_open"),
+            "open_seconds_left": round(max(0.0, self.open_until - now), 1) if self.is_open(now) else 0.0,
+            "probe_in_flight": self.probe is not None,
+            "first_token_ewma_ms": round(self.first_token_ms, 1) if self.first_token_ms is not None else None,
+            "total_ewma_ms": round(self.total_ms, 1) if self.total_ms is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class LLMRouter:
+    """Memilih penyedia per request dengan antarmuka yang sama seperti penyedia:
+    generate(prompt, history, stream=...). prompt boleh berupa prompt_builder.ChatPrompt; prompt dan
+    riwayatnya lalu disusun sesuai anggaran token penyedia yang sedang dicoba.
+
+    Potongan hasil stream sama dengan milik penyedia, ditambah:
+      {"notice": teks}                     failover/hedging terjadi (ditampilkan sebagai peringatan)
+      {"provider": nama, "model": nama}    penyedia yang menjawab, tepat sebelum teks pertamanya
+      {"usage": {...}, "model": nama}      model penyedia yang benar-benar menjawab
+    Failover hanya mungkin sebelum token pertama; gagal di tengah jawaban tetap menjadi error.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._health = {provider.name: ProviderHealth(provider.name, provider.model) for provider in providers}
+        self._lock = threading.Lock()
+
+    def health(self):
+        with self._lock:
+            return [self._health[provider.name].snapshot() for provider in self.providers]
+
+    def _candidates(self, probe):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [p for p in self.providers if not self._health[p.name].is_open(now)]
+            for p in candidates:
+                # Half-open: request ini menjadi satu-satunya percobaan sampai _release_probes(probe)
+                if self._health[p.name].consecutive_failures >= LLM_CIRCUIT_FAILURES:
+                    self._health[p.name].probe = probe
+            if LLM_ROUTING == "latency":
+                # Penyedia tanpa data latensi dicoba lebih dulu agar EWMA-nya terisi
+                candidates.sort(key=lambda p: self._health[p.name].first_token_ms or 0.0)
+        # Semua circuit terbuka: tetap coba sesuai prioritas daripada langsung gagal
+        return candidates or list(self.providers)
+
+    def _release_probes(self, probe):
+        with self._lock:
+            for health in self._health.values():
+                if health.probe is probe:
+                    health.probe = None
+
+    def _record(self, provider, error=None, first_token=None, total=None):
+        with self._lock:
+            if error is not None:
+                self._health[provider.name].record_failure(error)
+            else:
+                self._health[provider.name].record_success(first_token, total)
+
+    @staticmethod
+    def _prompt_for(provider, prompt, history):
+        if hasattr(prompt, "for_provider"):
+            return prompt.for_provider(provider.name)
+        return prompt, history
+
+    def generate(self, prompt, history=None, stream=False):
+        if stream:
+            return self._stream(prompt, history)
+        parts, usage, model = [], None, None
+        for chunk in self.generate(prompt, history, stream=True):
+            if chunk.get("provider"):
+                model = chunk["model"]
+            if chunk.get("text"):
+                parts.append(chunk["text"])
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+        return {"text": "".join(parts), "usage": usage, "model": model}
+
+    def _stream(self, prompt, history):
+        # Kandidat dipilih saat stream mulai dibaca, sehingga klaim percobaan half-open selalu dilepas di finally
+        probe = object()
+        candidates = self._candidates(probe)
+        try:
+            if LLM_HEDGE_AFTER_MS > 0 and len(candidates) > 1:
+                yield from self._hedged_stream(candidates, prompt, history)
+            else:
+                yield from self._failover_stream(candidates, prompt, history)
+        finally:
+            self._release_probes(probe)
+
+    @staticmethod
+    def _tag_usage(chunk, provider):
+        return {**chunk, "model": provider.model} if chunk.get("usage") else chunk
+
+    @staticmethod
+    def _answered_by(provider):
+        return {"provider": provider.name, "model": provider.model}
+
+    def _failover_stream(self, candidates, prompt, history):
+        last_error = None
+        for provider in candidates:
+            if last_error is not None:
+                yield {"notice": f"Penyedia LLM sebelumnya gagal ({last_error}), beralih ke '{provider.name}'."}
+            started = time.monotonic()
+            first_token = None
+            try:
+                for chunk in provider.generate(*self._prompt_for(provider, prompt, history), stream=True):
+                    if first_token is None and chunk.get("text"):
+                        first_token = time.monotonic() - started
+                        yield self._answered_by(provider)
+                    yield self._tag_usage(chunk, provider)
+            except Exception as e:
+                self._record(provider, error=e)
+                if first_token is not None:
+                    raise  # sebagian jawaban sudah terkirim ke pengguna
+                last_error = e
+                continue
+            self._record(provider, first_token=first_token, total=time.monotonic() - started)
+            return
+        raise last_error
+
+    def _hedged_stream(self, candidates, prompt, history):
+        events = queue.Queue()
+        stops = {}
+
+        def run(index, provider):
+            started = time.monotonic()
+            first_token = None
+            stream = provider.generate(*self._prompt_for(provider, prompt, history), stream=True)
+            try:
+                for chunk in stream:
+                    if stops[index].is_set():
+                        return  # kalah hedging / request selesai: hasil dibuang
+                    if first_token is None and chunk.get("text"):
+                        first_token = time.monotonic() - started
+                    events.put((index, "chunk", chunk))
+            except Exception as e:
+                if not stops[index].is_set():
+                    self._record(provider, error=e)
+                events.put((index, "error", e))
+                return
+            finally:
+                stream.close()
+            if first_token is None:
+                # Selesai tanpa teks (mis. hanya chunk usage): perlakukan sebagai kegagalan
+                error = RuntimeError(f"'{provider.name}' selesai tanpa teks jawaban")
+                if not stops[index].is_set():
+                    self._record(provider, error=error)
+                events.put((index, "error", error))
+                return
+            self._record(provider, first_token=first_token, total=time.monotonic() - started)
+            events.put((index, "done", None))
+
+        def launch(index):
+            stops[index] = threading.Event()
+            threading.Thread(target=run, args=(index, candidates[index]), daemon=True,
+                             name=f"llm-{candidates[index].name}").start()
+
+        running, winner, next_index = {0}, None, 1
+        buffered = {}  # index -> chunk tanpa teks yang datang sebelum pemenang ditentukan
+        launch(0)
+        hedge_at = time.monotonic() + LLM_HEDGE_AFTER_MS / 1000
+        try:
+            while True:
+                timeout = None
+                if winner is None and next_index < len(candidates):
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    index, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    yield {"notice": f"'{candidates[max(running)].name}' belum menjawab dalam {LLM_HEDGE_AFTER_MS:.0f} ms, "
+                                     f"'{candidates[next_index].name}' dijalankan bersamaan."}
+                    launch(next_index)
+                    running.add(next_index)
+                    next_index += 1
+                    hedge_at = time.monotonic() + LLM_HEDGE_AFTER_MS / 1000
+                    continue
+
+                if winner is not None and index != winner:
+                    continue
+                if kind == "error":
+                    if index == winner:
+                        raise payload
+                    running.discard(index)
+                    if running:
+                        continue
+                    if next_index >= len(candidates):
+                        raise payload
+                    yield {"notice": f"Penyedia LLM sebelumnya gagal ({payload}), beralih ke '{candidates[next_index].name}'."}
+                    launch(next_index)
+                    running.add(next_index)
+                    next_index += 1
+                    hedge_at = time.monotonic() + LLM_HEDGE_AFTER_MS / 1000
+                    continue
+
+                if winner is None:
+                    if not payload.get("text"):
+                        buffered.setdefault(index, []).append(payload)
+                        continue
+                    # Pemenang = penyedia pertama yang mengirim teks jawaban
+                    winner = index
+                    for other in running - {index}:
+                        stops[other].set()
+                    yield self._answered_by(candidates[index])
+                    for chunk in buffered.pop(index, []):
+                        yield self._tag_usage(chunk, candidates[index])
+                if kind == "done":
+                    return
+                yield self._tag_usage(payload, candidates[index])
+        finally:
+            # Klien memutus stream atau sudah selesai: hentikan semua thread penyedia
+            for stop in stops.values():
+                stop.set()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """LLMRouter atas semua penyedia terkonfigurasi (dibuat sekali per proses), atau None jika tidak ada."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                providers = llm_providers.get_providers()
+                _router = LLMRouter(providers) if providers else False
+    return _router or None
@@ -0,0 +1,96 @@
+import os
+import re
+import time
+import threading
+import unicodedata
+from langchain_core.documents import Document
+from database import get_all_memory_data
+from index_registry import read_generation, INDEX_RELOAD_CHECK_SECONDS
+
+# --- Fast path Memory Bank: pertanyaan kurasi yang diketik (hampir) persis ---
+# "direct" = kembalikan jawaban tersimpan tanpa LLM, "llm" = kirim hanya dokumen itu ke LLM, "off" = nonaktif
+MEMORY_FAST_PATH_MODE = os.getenv("MEMORY_FAST_PATH_MODE", "direct").lower()
+# Listener perubahan hanya berjalan di worker yang melakukan penulisan. Worker lain membangun ulang peta
+# saat generasi indeks berubah (dicek paling sering tiap INDEX_RELOAD_CHECK_SECONDS, juga lewat on_swap
+# registry indeks) dan paling lambat setelah TTL ini, untuk penyiapan tanpa sinkronisasi indeks.
+MEMORY_LOOKUP_TTL_SECONDS = float(os.getenv("MEMORY_LOOKUP_TTL_SECONDS", "60"))
+
+# Kata pengisi yang tidak mengubah maksud pertanyaan. Kata tanya (apa, siapa, kapan, ...) sengaja dipertahankan.
+INDONESIAN_STOP_WORDS = {
+    "yang", "itu", "ini", "adalah", "ialah", "merupakan", "apakah", "kah",
+    "dong", "sih", "ya", "yah", "nih", "deh", "kok", "tuh",
+    "tolong", "mohon", "saya", "aku", "mau", "ingin", "tanya", "nanya",
+    "kak", "min", "admin", "gan", "pak", "bu", "halo", "hai",
+}
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+_lock = threading.Lock()
+_question_map = None  # pertanyaan ternormalisasi -> item memory
+_map_generation = None   # generasi indeks saat peta dibangun
+_map_expires = 0.0
+_next_check = 0.0
+
+
+def normalize_question(text):
+    """Casefold, normalisasi unicode/tanda baca/spasi, lalu buang kata pengisi."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    words = [word for word in _NON_WORD.sub(" ", text).replace("_", " ").split() if word not in INDONESIAN_STOP_WORDS]
+    return " ".join(words)
+
+
+def _build_map():
+    question_map = {}
+    for item in get_all_memory_data():
+        key = normalize_question(item.get("question"))
+        # get_all_memory_data() terurut dari yang terbaru, jadi entri terbaru yang menang
+        if key and key not in question_map:
+            question_map[key] = item
+    return question_map
+
+
+def invalidate(collection=None, *_args):
+    """Listener perubahan data / hook pertukaran generasi indeks: bangun ulang peta hanya jika Memory Bank
+    (atau sumber yang tidak diketahui) berubah."""
+    global _question_map
+    if collection in (None, "memory_bank"):
+        with _lock:
+            _question_map = None
+
+
+def _is_stale(now):
+    global _next_check
+    if now < _next_check:
+        return False
+    _next_check = now + INDEX_RELOAD_CHECK_SECONDS
+    return now >= _map_expires or read_generation() != _map_generation
+
+
+def lookup(user_query):
+    """Mengembalikan item Memory Bank {"id", "question", "answer", ...} yang cocok persis, atau None."""
+    global _question_map, _map_generation, _map_expires
+    if MEMORY_FAST_PATH_MODE == "off":
+        return None
+    key = normalize_question(user_query)
+    if not key:
+        return None
+    now = time.monotonic()
+    question_map = _question_map
+    if question_map is None or _is_stale(now):
+        with _lock:
+            if _question_map is None or _question_map is question_map:
+                # Generasi dibaca sebelum membangun: perubahan selama pembangunan terdeteksi di cek berikutnya
+                _map_generation = read_generation()
+                _map_expires = now + MEMORY_LOOKUP_TTL_SECONDS
+                _question_map = _build_map()
+            question_map = _question_map
+    return question_map.get(key)
+
+
+def as_document(item):
+    """Dokumen dengan format yang sama seperti get_memory_documents_for_indexing()."""
+    page_content = f"Pertanyaan: {item['question']}\nJawaban Pasti: {item['answer']}"
+    metadata = {"source": f"Memory Bank: {item['question'][:50]}...", "title": item['question'], "type": "Memory Bank", "doc_id": item.get('id')}
+    return Document(page_content=page_content, metadata=metadata)
@@ -1,14 +1,27 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 import time
+import threading
 import trafilatura
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from urllib.parse import urljoin, urlparse
+from email.utils import parsedate_to_datetime
 import docx
 import PyPDF2
 from pptx import Presentation
 import socket
 import ipaddress
 import re
+import hashlib
+from collections import deque
+# Sengaja concurrent.futures biasa (bukan serving.new_executor) di kedua SERVING_MODE: wait/as_completed
+# hanya cocok dengan future-nya sendiri. Di bawah gevent, threading sudah di-monkey-patch sehingga pool
+# ini menjadi greenlet di thread job; scraping didominasi I/O jaringan, jadi tetap berjalan bersamaan.
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, as_completed
 
 def is_safe_url(url):
     try:
@@ -31,6 +44,206 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# --- Kesopanan & konkurensi scraping ---
+# Setiap host dibatasi token bucket: lonjakan hingga SCRAPE_HOST_BURST request, lalu rata-rata sesuai laju
+# host tersebut, menggantikan jeda tetap sebelum setiap halaman. Laju diatur adaptif (AIMD): mulai dari
+# SCRAPE_HOST_RATE request/detik, naik SCRAPE_RATE_INCREASE per respons sehat hingga SCRAPE_HOST_MAX_RATE,
+# dan turun setengahnya (min. SCRAPE_HOST_MIN_RATE) saat server membalas 429/503; Retry-After dihormati
+# dan request tersebut diulang hingga SCRAPE_MAX_RETRIES kali. Crawl mengambil hingga CRAWL_CONCURRENCY
+# halaman bersamaan, scrape daftar URL hingga SCRAPE_CONCURRENCY; batas per host berlaku untuk semuanya.
+SCRAPE_HOST_RATE = float(os.getenv("SCRAPE_HOST_RATE", "2"))
+SCRAPE_HOST_MIN_RATE = float(os.getenv("SCRAPE_HOST_MIN_RATE", "0.2"))
+SCRAPE_HOST_MAX_RATE = float(os.getenv("SCRAPE_HOST_MAX_RATE", "8"))
+SCRAPE_RATE_INCREASE = float(os.getenv("SCRAPE_RATE_INCREASE", "0.25"))
+SCRAPE_HOST_BURST = int(os.getenv("SCRAPE_HOST_BURST", "4"))
+SCRAPE_MAX_RETRIES = int(os.getenv("SCRAPE_MAX_RETRIES", "3"))
+SCRAPE_MAX_RETRY_AFTER_SECONDS = 120   # Retry-After yang lebih lama dari ini dipotong
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+THROTTLE_STATUS_CODES = {429, 503}
+
+# --- Klien HTTP scraping (lihat get_session) ---
+SCRAPE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "15"))
+SCRAPE_POOL_HOSTS = int(os.getenv("SCRAPE_POOL_HOSTS", "4"))        # jumlah host yang pool koneksinya disimpan
+SCRAPE_POOL_MAXSIZE = int(os.getenv("SCRAPE_POOL_MAXSIZE", "16"))   # koneksi keep-alive per host
+SCRAPE_HTTP_RETRIES = int(os.getenv("SCRAPE_HTTP_RETRIES", "2"))    # error koneksi / 500 / 502 / 504
+SCRAPE_HTTP_BACKOFF_SECONDS = float(os.getenv("SCRAPE_HTTP_BACKOFF_SECONDS", "0.5"))
+SCRAPE_MAX_RESPONSE_BYTES = int(os.getenv("SCRAPE_MAX_RESPONSE_BYTES", str(10 * 1024 * 1024)))
+
+
+class HostRateLimiter:
+    """Token bucket adaptif per host yang aman dipakai banyak thread.
+
+    acquire(host) menunggu sampai ada token; record_success/record_throttled menyesuaikan laju host
+    (tambah linear, turun setengah) dan record_throttled menahan host selama Retry-After.
+    """
+
+    def __init__(self, rate, burst, min_rate=SCRAPE_HOST_MIN_RATE, max_rate=SCRAPE_HOST_MAX_RATE):
+        self.initial_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.max_rate = max(max_rate, rate)
+        self.burst = max(1, burst)
+        self._hosts = {}   # host -> {"tokens", "last", "rate", "blocked_until"}
+        self._lock = threading.Lock()
+
+    def _state(self, host, now):
+        if host not in self._hosts:
+            self._hosts[host] = {"tokens": float(self.burst), "last": now, "rate": self.initial_rate, "blocked_until": 0.0}
+        return self._hosts[host]
+
+    def acquire(self, host):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                state = self._state(host, now)
+                if now < state["blocked_until"]:
+                    wait_seconds = state["blocked_until"] - now
+                else:
+                    state["tokens"] = min(self.burst, state["tokens"] + (now - state["last"]) * state["rate"])
+                    state["last"] = now
+                    if state["tokens"] >= 1:
+                        state["tokens"] -= 1
+                        return
+                    wait_seconds = (1 - state["tokens"]) / state["rate"]
+            time.sleep(wait_seconds)
+
+    def record_success(self, host):
+        with self._lock:
+            state = self._state(host, time.monotonic())
+            state["rate"] = min(self.max_rate, state["rate"] + SCRAPE_RATE_INCREASE)
+
+    def record_throttled(self, host, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, now)
+            state["rate"] = max(self.min_rate, state["rate"] / 2)
+            state["tokens"] = 0.0
+            state["last"] = now
+            # Tanpa Retry-After: beri jeda satu interval pada laju yang baru
+            pause = retry_after if retry_after is not None else 1 / state["rate"]
+            state["blocked_until"] = max(state["blocked_until"], now + pause)
+
+    def rate(self, host):
+        with self._lock:
+            return self._state(host, time.monotonic())["rate"]
+
+
+host_limiter = HostRateLimiter(SCRAPE_HOST_RATE, SCRAPE_HOST_BURST)
+
+
+def _retry_after_seconds(response):
+    """Nilai header Retry-After (detik atau tanggal HTTP) dalam detik, atau None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = retry_at.timestamp() - time.time()
+    return min(SCRAPE_MAX_RETRY_AFTER_SECONDS, max(0.0, seconds))
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """Respons melebihi SCRAPE_MAX_RESPONSE_BYTES; unduhan dihentikan."""
+
+
+def get_session():
+    """requests.Session bersama (dibuat sekali per proses) untuk semua jalur scraping.
+
+    Koneksi keep-alive ke host sekolah dipakai ulang antar halaman, jadi TCP + TLS handshake hanya
+    terjadi sekali per koneksi pool, bukan per URL. Error koneksi dan 500/502/504 diulang otomatis
+    dengan backoff; 429/503 ditangani fetch_url lewat batas laju adaptif.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=SCRAPE_HTTP_RETRIES,
+                    backoff_factor=SCRAPE_HTTP_BACKOFF_SECONDS,
+                    status_forcelist=(500, 502, 504),
+                    allowed_methods=frozenset(["GET", "HEAD"]),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=SCRAPE_POOL_HOSTS, pool_maxsize=SCRAPE_POOL_MAXSIZE,
+                                      pool_block=False, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                # gzip/deflate selalu; br juga jika paket Brotli terpasang (didekode otomatis oleh urllib3)
+                session.headers.update({**HEADERS, 'Accept-Encoding': ACCEPT_ENCODING})
+                _session = session
+    return _session
+
+
+def _read_limited(response):
+    """Membaca body respons stream, berhenti jika melebihi SCRAPE_MAX_RESPONSE_BYTES (setelah dekompresi)."""
+    declared = response.headers.get('Content-Length')
+    if declared and declared.isdigit() and int(declared) > SCRAPE_MAX_RESPONSE_BYTES:
+        response.close()
+        raise ResponseTooLarge(f"Respons {declared} byte melebihi batas {SCRAPE_MAX_RESPONSE_BYTES} byte.")
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        body.extend(chunk)
+        if len(body) > SCRAPE_MAX_RESPONSE_BYTES:
+            response.close()
+            raise ResponseTooLarge(f"Respons melebihi batas {SCRAPE_MAX_RESPONSE_BYTES} byte.")
+    response._content = bytes(body)
+    return response
+
+
+def fetch_url(url, html_only=False, page_state=None):
+    """GET url lewat session bersama dengan batas laju per host; 429/503 memperlambat host dan diulang
+    setelah Retry-After. html_only=True: body respons non-HTML tidak diunduh (cukup header-nya).
+    page_state (validator tersimpan dari scrape sebelumnya) menjadikannya request kondisional: server
+    membalas 304 tanpa body jika halaman tidak berubah."""
+    host = urlparse(url).netloc
+    headers = {}
+    if page_state and page_state.get('etag'):
+        headers['If-None-Match'] = page_state['etag']
+    if page_state and page_state.get('last_modified'):
+        headers['If-Modified-Since'] = page_state['last_modified']
+    for attempt in range(SCRAPE_MAX_RETRIES + 1):
+        host_limiter.acquire(host)
+        response = get_session().get(url, headers=headers, timeout=SCRAPE_TIMEOUT_SECONDS, stream=True)
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            host_limiter.record_success(host)
+            if html_only and response.status_code != 304 and 'text/html' not in response.headers.get('Content-Type', ''):
+                response.close()
+                return response
+            return _read_limited(response)
+        host_limiter.record_throttled(host, _retry_after_seconds(response))
+        if attempt < SCRAPE_MAX_RETRIES:
+            response.close()
+    return _read_limited(response)  # percobaan habis: raise_for_status() pemanggil melaporkan 429/503
+
+
+def _sha256(data):
+    return hashlib.sha256(data if isinstance(data, bytes) else data.encode('utf-8')).hexdigest()
+
+
+def _unchanged_result(url, response, reason):
+    return {"status": "unchanged", "url": url, "reason": reason, "image_url": None,
+            "etag": response.headers.get('ETag'), "last_modified": response.headers.get('Last-Modified')}
+
+
+def _page_fingerprint(response, title, content, image_url):
+    """Validator yang disimpan bersama hasil scrape untuk request kondisional berikutnya."""
+    return {
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "body_hash": _sha256(response.content),
+        "content_hash": _sha256(f"{title}\n{image_url}\n{content}"),
+    }
+
 def extract_text_from_pdf(file_stream):
     """Mengekstrak teks dari file PDF."""
     try:
@@ -67,92 +280,171 @@ def extract_text_from_pptx(file_stream):
         return None
 
 
-def clean_html_boilerplate(html_text):
-    soup = BeautifulSoup(html_text, 'html.parser')
-    for tag in soup.find_all(['nav', 'footer', 'header', 'aside', 'script', 'style', 'noscript']):
-        tag.decompose()
-    junk_selectors = [
-        '.sidebar', '#sidebar', '.menu', '#menu', '.navbar', '#navbar', 
-        '.widget', '.footer', '.comments', '.ad', '.advertisement', 
-        '.cookie-banner', '.popup'
-    ]
-    for selector in junk_selectors:
-        for element in soup.select(selector):
-            element.decompose()
-    return str(soup)
-
-def extract_single_page(url):
+# --- Ekstraksi halaman: satu kali parse lxml per halaman ---
+# Pohon yang sama dipakai untuk link, metadata (judul), gambar utama, lalu dibersihkan dari boilerplate
+# dan diberikan langsung ke trafilatura (yang menyalin pohon, bukan mem-parse ulang HTML).
+BOILERPLATE_TAGS = ('nav', 'footer', 'header', 'aside', 'script', 'style', 'noscript')
+JUNK_SELECTORS = [
+    '.sidebar', '#sidebar', '.menu', '#menu', '.navbar', '#navbar',
+    '.widget', '.footer', '.comments', '.ad', '.advertisement',
+    '.cookie-banner', '.popup'
+]
+
+
+def _selector_xpath(selector):
+    # Hanya ".kelas" dan "#id" yang dipakai JUNK_SELECTORS
+    if selector.startswith('#'):
+        return f"//*[@id='{selector[1:]}']"
+    return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {selector[1:]} ')]"
+
+
+BOILERPLATE_XPATH = " | ".join([f"//{tag}" for tag in BOILERPLATE_TAGS] + [_selector_xpath(s) for s in JUNK_SELECTORS])
+CONTENT_AREA_PATTERN = re.compile(r'content|post|entry|berita|detail', re.I)
+SKIPPED_IMAGE_HINTS = ['logo', 'icon', 'favicon', 'avatar', 'banner', 'pixel', 'tracking', 'spacer']
+# Simple heuristic to avoid downloading large binaries during link discovery
+IGNORED_EXTENSIONS = {'.pdf', '.zip', '.rar', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.png', '.jpg', '.jpeg', '.gif', '.mp4', '.mp3'}
+IGNORED_PATHS = {'/login', '/admin', '/wp-admin', '/logout', '/tag/', '/category/', '/author/', '/page/'}
+
+
+def parse_html(html_text):
+    """Pohon lxml dari teks HTML, atau None jika dokumen kosong/tidak bisa di-parse."""
+    try:
+        # Di-encode ulang ke bytes: lxml menolak str yang memuat deklarasi encoding <?xml ...?>
+        return lxml.html.document_fromstring(html_text.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def strip_boilerplate(tree):
+    """Membuang menu, sidebar, footer, script, dsb. dari pohon (in place)."""
+    for element in tree.xpath(BOILERPLATE_XPATH):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+
+def _internal_links(tree, page_url, domain):
+    """Link ke halaman lain di domain yang sama, tanpa fragment dan tanpa file/halaman yang diabaikan."""
+    links = []
+    for a_tag in tree.iter('a'):
+        href = a_tag.get('href')
+        if href is None:
+            continue
+        absolute_url = urljoin(page_url, href)
+        # Remove fragments
+        absolute_url = urlparse(absolute_url)._replace(fragment="").geturl()
+
+        parsed_href = urlparse(absolute_url)
+
+        if parsed_href.netloc == domain:
+            # Ignore specific extensions and paths
+            ext = parsed_href.path.lower()
+            if any(ext.endswith(e) for e in IGNORED_EXTENSIONS): continue
+            if any(p in parsed_href.path.lower() for p in IGNORED_PATHS): continue
+            links.append(absolute_url)
+    return links
+
+
+def _primary_image(tree, page_url):
     """
-    Extracts content and the single best thumbnail image URL from a page.
-    FIX #5: Stores only ONE image_url (og:image preferred, else first in-content image).
+    FIX #5: Only ONE image_url (og:image preferred, else first in-content image).
     This prevents comma-joined multi-URL strings from breaking img src attributes.
     """
+    # Priority 1: og:image — best thumbnail/representative image
+    for og_image in tree.iter('meta'):
+        if og_image.get('property') == 'og:image' and og_image.get('content'):
+            return urljoin(page_url, og_image.get('content'))
+
+    # Priority 2: First <img> inside the main content area of the RAW HTML
+    # (trafilatura strips images, so we must search before boilerplate removal)
+    # Look in common content containers first (elemen lxml tanpa anak bernilai False, jadi cek "is not None")
+    candidates = (
+        tree.iter('article'),
+        (div for div in tree.iter('div') if any(CONTENT_AREA_PATTERN.search(c) for c in (div.get('class') or '').split())),
+        (div for div in tree.iter('div') if CONTENT_AREA_PATTERN.search(div.get('id') or '')),
+        tree.iter('main'),
+        tree.iter('body'),
+    )
+    content_area = next((area for areas in candidates for area in areas), None)
+    if content_area is None:
+        return None
+    for img in content_area.iter('img'):
+        src = img.get('src')
+        if src is None:
+            continue
+        # Skip tiny icons, logos, and tracking pixels
+        width = img.get('width', '')
+        height = img.get('height', '')
+        if (width and width.isdigit() and int(width) < 50): continue
+        if (height and height.isdigit() and int(height) < 50): continue
+        # Skip common non-content images
+        src_lower = src.lower()
+        if any(skip in src_lower for skip in SKIPPED_IMAGE_HINTS): continue
+        return urljoin(page_url, src)
+    return None
+
+
+def extract_page(url, response, domain=None):
+    """
+    Single-parse extraction of a fetched HTML page. Returns (result status dict, links);
+    internal links are only collected (and stored in the result) when `domain` is given.
+    """
+    response.encoding = response.apparent_encoding
+    tree = parse_html(response.text)
+    if tree is None:
+        return {"status": "skipped", "url": url, "reason": "No main content found", "image_url": None}, []
+
+    links = _internal_links(tree, url, domain) if domain else []
+    metadata = trafilatura.extract_metadata(tree)
+    title = metadata.title if metadata else ""
+    primary_image_url = _primary_image(tree, url)
+
+    strip_boilerplate(tree)
+    content = trafilatura.extract(
+        tree,
+        include_comments=False,
+        include_tables=True,
+        favor_precision=True,
+        target_language="id"
+    )
+
+    if content:
+        content = re.sub(r'\n\s*\n', '\n\n', content).strip()
+        if len(content) < 150:
+            return {"status": "skipped", "url": url, "reason": "Content too short or mostly boilerplate", "image_url": None}, links
+        result = {"status": "success", "url": url, "title": title, "content": content, "image_url": primary_image_url,
+                  **_page_fingerprint(response, title, content, primary_image_url)}
+        if domain:
+            result["links"] = links
+        return result, links
+    return {"status": "skipped", "url": url, "reason": "No main content found", "image_url": None}, links
+
+def extract_single_page(url, page_state=None):
+    """
+    Extracts content and the single best thumbnail image URL from a page.
+    With page_state (stored validators of the previous scrape) the request is conditional:
+    a 304 or an identical body returns status "unchanged" without extraction.
+    """
     try:
         if not is_safe_url(url):
             return {"status": "error", "url": url, "reason": "URL is not allowed (SSRF protection).", "image_url": None}
             
-        response = requests.get(url, headers=HEADERS, timeout=15)
+        response = fetch_url(url, page_state=page_state)
+        if response.status_code == 304:
+            return _unchanged_result(url, response, "304 Not Modified")
         response.raise_for_status()
-        response.encoding = response.apparent_encoding
-        
-        html_content = response.text
-        cleaned_html = clean_html_boilerplate(html_content)
-        content = trafilatura.extract(
-            cleaned_html, 
-            include_comments=False, 
-            include_tables=True,
-            favor_precision=True,
-            target_language="id"
-        )
-        title = trafilatura.extract_metadata(html_content).title if trafilatura.extract_metadata(html_content) else ""
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        primary_image_url = None
-
-        # Priority 1: og:image — best thumbnail/representative image
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            primary_image_url = urljoin(url, og_image['content'])
-
-        # Priority 2: First <img> inside the main content area of the RAW HTML
-        # (trafilatura strips images, so we must search the original HTML)
-        if not primary_image_url:
-            # Look in common content containers first
-            content_area = (
-                soup.find('article') or
-                soup.find('div', class_=re.compile(r'content|post|entry|berita|detail', re.I)) or
-                soup.find('div', id=re.compile(r'content|post|entry|berita|detail', re.I)) or
-                soup.find('main') or
-                soup.body
-            )
-            if content_area:
-                for img in content_area.find_all('img', src=True):
-                    src = img['src']
-                    # Skip tiny icons, logos, and tracking pixels
-                    width = img.get('width', '')
-                    height = img.get('height', '')
-                    if (width and width.isdigit() and int(width) < 50): continue
-                    if (height and height.isdigit() and int(height) < 50): continue
-                    # Skip common non-content images
-                    src_lower = src.lower()
-                    if any(skip in src_lower for skip in ['logo', 'icon', 'favicon', 'avatar', 'banner', 'pixel', 'tracking', 'spacer']): continue
-                    primary_image_url = urljoin(url, src)
-                    break
-
-        if content:
-            content = re.sub(r'\n\s*\n', '\n\n', content).strip()
-            if len(content) < 150:
-                return {"status": "skipped", "url": url, "reason": "Content too short or mostly boilerplate", "image_url": None}
-            return {"status": "success", "url": url, "title": title, "content": content, "image_url": primary_image_url}
-        else:
-            return {"status": "skipped", "url": url, "reason": "No main content found", "image_url": None}
+        if page_state and page_state.get('body_hash') == _sha256(response.content):
+            return _unchanged_result(url, response, "Isi halaman identik")
+        return extract_page(url, response)[0]
 
     except requests.exceptions.RequestException as e:
         return {"status": "error", "url": url, "reason": str(e), "image_url": None}
 
-def scrape_from_file(file_path):
+def scrape_from_file(file_path, concurrency=None, page_states=None):
     """
-    Reads a file of URLs and yields the extraction result for each URL.
+    Reads a file of URLs and yields the extraction result for each URL as soon as it finishes.
+    Up to `concurrency` URLs (default SCRAPE_CONCURRENCY) are fetched at once under the adaptive
+    per-host rate limit. Each result carries "index" (0-based position in the file) and "total".
+    page_states (url -> stored validators) makes requests conditional; see extract_single_page.
     """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -162,120 +454,93 @@ def scrape_from_file(file_path):
         return
         
     yield {"status": "info", "message": f"Ditemukan {len(urls)} URL untuk di-scrape."}
+    if not urls:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency or SCRAPE_CONCURRENCY))
+    try:
+        page_states = page_states or {}
+        futures = {executor.submit(extract_single_page, url, page_states.get(url)): index for index, url in enumerate(urls)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "url": urls[index], "reason": str(e), "image_url": None}
+            yield {**result, "index": index, "total": len(urls)}
+    finally:
+        # Job dibatalkan: URL yang belum mulai tidak perlu diambil lagi
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _crawl_page(current_url, domain, page_state=None):
+    """
+    Fetches and extracts one crawled page (runs in a crawl worker thread).
+    Returns (result status dict, list of internal links found on the page).
+    An unchanged page (304 / identical body) reuses the links stored with page_state.
+    """
+    links = []
+    # Tanpa daftar link tersimpan, halaman tetap harus diunduh agar crawl bisa berlanjut
+    if page_state is not None and page_state.get('links') is None:
+        page_state = None
+    try:
+        if not is_safe_url(current_url):
+            return {"status": "skipped", "url": current_url, "reason": "URL is not allowed (SSRF protection)."}, links
+
+        response = fetch_url(current_url, html_only=True, page_state=page_state)
+        if response.status_code == 304:
+            return _unchanged_result(current_url, response, "304 Not Modified"), page_state['links']
+        # Only process if HTML
+        if 'text/html' not in response.headers.get('Content-Type', ''):
+            return {"status": "skipped", "url": current_url, "reason": "Bukan HTML content"}, links
 
-    for url in urls:
-        time.sleep(4.5)  # Delay to prevent 429 Too Many Requests
-        yield extract_single_page(url)
+        response.raise_for_status()
+        if page_state and page_state.get('body_hash') == _sha256(response.content):
+            return _unchanged_result(current_url, response, "Isi halaman identik"), page_state['links']
+        return extract_page(current_url, response, domain)
+
+    except Exception as e:
+        return {"status": "error", "url": current_url, "reason": str(e), "image_url": None}, links
 
-def crawl_website(base_url, max_pages=50):
+def crawl_website(base_url, max_pages=50, concurrency=None, page_states=None):
     """
-    Crawls a website starting from base_url, discovering internal links, 
-    and scraping each page up to max_pages.
+    Crawls a website starting from base_url, discovering internal links,
+    and scraping each page up to max_pages. Pages are fetched by a pool of
+    `concurrency` workers (default CRAWL_CONCURRENCY), politely rate-limited per host;
+    results are yielded as soon as each page finishes.
+    page_states (url -> stored validators) makes requests conditional; see _crawl_page.
     """
     yield {"status": "info", "message": f"Memulai deep crawl di: {base_url} (max {max_pages} halaman)"}
-    
+
     domain = urlparse(base_url).netloc
     if not domain:
         yield {"status": "error", "url": base_url, "reason": "URL tidak valid."}
         return
 
-    visited = set()
-    queue = [base_url]
-    
-    # Simple heuristic to avoid downloading large binaries during link discovery
-    ignored_extensions = {'.pdf', '.zip', '.rar', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.png', '.jpg', '.jpeg', '.gif', '.mp4', '.mp3'}
-    ignored_paths = {'/login', '/admin', '/wp-admin', '/logout', '/tag/', '/category/', '/author/', '/page/'}
-    
-    while queue and len(visited) < max_pages:
-        current_url = queue.pop(0)
-        
-        if current_url in visited:
-            continue
-            
-        visited.add(current_url)
-        time.sleep(1.5)  # Delay to prevent 429 Too Many Requests
-        yield {"status": "info", "message": f"[{len(visited)}/{max_pages}] Scrape: {current_url}"}
-        
-        # 1. Fetch the page to get links and content
-        try:
-            if not is_safe_url(current_url):
-                yield {"status": "skipped", "url": current_url, "reason": "URL is not allowed (SSRF protection)."}
-                continue
-                
-            response = requests.get(current_url, headers=HEADERS, timeout=15)
-            # Only process if HTML
-            if 'text/html' not in response.headers.get('Content-Type', ''):
-                yield {"status": "skipped", "url": current_url, "reason": "Bukan HTML content"}
-                continue
-                
-            response.raise_for_status()
-            response.encoding = response.apparent_encoding
-            html_content = response.text
-            
-            # 2. Find links for the queue
-            soup = BeautifulSoup(html_content, 'html.parser')
-            for a_tag in soup.find_all('a', href=True):
-                href = a_tag['href']
-                absolute_url = urljoin(current_url, href)
-                # Remove fragments
-                absolute_url = urlparse(absolute_url)._replace(fragment="").geturl()
-                
-                parsed_href = urlparse(absolute_url)
-                
-                if parsed_href.netloc == domain:
-                    # Ignore specific extensions and paths
-                    ext = parsed_href.path.lower()
-                    if any(ext.endswith(e) for e in ignored_extensions): continue
-                    if any(p in parsed_href.path.lower() for p in ignored_paths): continue
-                        
-                    if absolute_url not in visited and absolute_url not in queue:
-                        queue.append(absolute_url)
-                        
-            # 3. Extract content (reusing logic from extract_single_page)
-            cleaned_html = clean_html_boilerplate(html_content)
-            content = trafilatura.extract(
-                cleaned_html, 
-                include_comments=False, 
-                include_tables=True,
-                favor_precision=True,
-                target_language="id"
-            )
-            title = trafilatura.extract_metadata(html_content).title if trafilatura.extract_metadata(html_content) else ""
-            
-            primary_image_url = None
-            og_image = soup.find('meta', property='og:image')
-            if og_image and og_image.get('content'):
-                primary_image_url = urljoin(current_url, og_image['content'])
-            if not primary_image_url:
-                content_area = (
-                    soup.find('article') or
-                    soup.find('div', class_=re.compile(r'content|post|entry|berita|detail', re.I)) or
-                    soup.find('div', id=re.compile(r'content|post|entry|berita|detail', re.I)) or
-                    soup.find('main') or
-                    soup.body
-                )
-                if content_area:
-                    for img in content_area.find_all('img', src=True):
-                        src = img['src']
-                        width = img.get('width', '')
-                        height = img.get('height', '')
-                        if (width and width.isdigit() and int(width) < 50): continue
-                        if (height and height.isdigit() and int(height) < 50): continue
-                        src_lower = src.lower()
-                        if any(skip in src_lower for skip in ['logo', 'icon', 'favicon', 'avatar', 'banner', 'pixel', 'tracking', 'spacer']): continue
-                        primary_image_url = urljoin(current_url, src)
-                        break
-
-            if content:
-                content = re.sub(r'\n\s*\n', '\n\n', content).strip()
-                if len(content) < 150:
-                    yield {"status": "skipped", "url": current_url, "reason": "Content too short or mostly boilerplate", "image_url": None}
-                else:
-                    yield {"status": "success", "url": current_url, "title": title, "content": content, "image_url": primary_image_url}
-            else:
-                yield {"status": "skipped", "url": current_url, "reason": "No main content found", "image_url": None}
+    frontier = deque([base_url])
+    seen = {base_url}        # URL yang sudah pernah masuk frontier (dijadwalkan atau menunggu)
+    scheduled = 0
+    pending = set()
+    workers = max(1, concurrency or CRAWL_CONCURRENCY)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    page_states = page_states or {}
+    try:
+        while pending or (frontier and scheduled < max_pages):
+            while frontier and scheduled < max_pages and len(pending) < workers:
+                current_url = frontier.popleft()
+                scheduled += 1
+                yield {"status": "info", "message": f"[{scheduled}/{max_pages}] Scrape: {current_url}"}
+                pending.add(executor.submit(_crawl_page, current_url, domain, page_states.get(current_url)))
 
-        except Exception as e:
-            yield {"status": "error", "url": current_url, "reason": str(e), "image_url": None}
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, links = future.result()
+                for link in links:
+                    if link not in seen:
+                        seen.add(link)
+                        frontier.append(link)
+                yield result
+    finally:
+        # Job dibatalkan/selesai: halaman yang belum mulai tidak perlu diambil lagi
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    yield {"status": "info", "message": f"Crawl selesai. Total dikunjungi: {len(visited)} halaman."}
+    yield {"status": "info", "message": f"Crawl selesai. Total dikunjungi: {scheduled} halaman."}
@@ -0,0 +1,48 @@
+import os
+import threading
+
+# --- Mode serving: "gthread" (default, satu thread per request) atau "async" (worker gevent) ---
+# Pada mode async, menunggu LLM/MongoDB/HTTP tidak lagi memegang thread OS: satu worker bisa
+# melayani ratusan percakapan. Pekerjaan CPU (embedding, FAISS) dipindahkan ke pool thread OS
+# berukuran tetap agar tidak memblokir event loop gevent.
+SERVING_MODE = os.getenv("SERVING_MODE", "gthread").lower()
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_gevent_active():
+    """True jika proses ini berjalan di bawah worker gevent (socket sudah di-monkey-patch)."""
+    try:
+        from gevent import monkey
+        return monkey.is_module_patched("socket")
+    except ImportError:
+        return False
+
+
+def new_executor(max_workers):
+    """Pool thread OS baru: gevent.threadpool di bawah gevent (future-nya bisa ditunggu
+    secara kooperatif), selain itu concurrent.futures biasa."""
+    if is_gevent_active():
+        from gevent.threadpool import ThreadPoolExecutor
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def get_executor():
+    """Pool thread OS bersama untuk pekerjaan blocking/CPU-bound di jalur request."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = new_executor(BLOCKING_POOL_SIZE)
+    return _executor
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Jalankan fn di pool thread OS jika gevent aktif; jika tidak, panggil langsung."""
+    if not is_gevent_active():
+        return fn(*args, **kwargs)
+    return get_executor().submit(fn, *args, **kwargs).result()
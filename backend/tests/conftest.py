@@ -0,0 +1,54 @@
+import os
+import sys
+import hashlib
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# Modul backend diimpor langsung, sama seperti saat app.py dijalankan dari backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Test tidak pernah menyentuh MongoDB sungguhan (load_dotenv tidak menimpa nilai yang sudah ada)
+os.environ["MONGO_URI"] = ""
+os.environ.setdefault("INDEX_SYNC_MODE", "off")
+
+
+class FakeEmbeddings(Embeddings):
+    """Embedding deterministik tanpa model: setiap kata di-hash ke satu dimensi vektor kecil.
+
+    Semua teks yang di-embed lewat embed_documents dicatat di `embedded` agar test bisa
+    memastikan hanya record baru/berubah yang di-embed ulang.
+    """
+
+    dimension = 16
+
+    def __init__(self):
+        self.embedded = []
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm > 0 else vector).tolist()
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    # Path relatif "db/..." milik modul backend diarahkan ke direktori sementara per test
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    import embedding_service
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(embedding_service, "_embeddings", embeddings)
+    monkeypatch.setattr(embedding_service, "EMBEDDING_PROCESSES", 0)
+    return embeddings
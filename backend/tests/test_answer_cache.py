@@ -0,0 +1,73 @@
+import pytest
+import answer_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_MAX_ENTRIES", 3)
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_TTL_SECONDS", 60)
+    monkeypatch.setattr(answer_cache, "_matrix", None)
+    monkeypatch.setattr(answer_cache, "_valid", None)
+    monkeypatch.setattr(answer_cache, "_expires", None)
+    monkeypatch.setattr(answer_cache, "_entries", answer_cache.OrderedDict())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _store(vector, answer):
+    answer_cache.store(vector, answer, answer, answer_cache.current_generation())
+
+
+def test_similar_query_hits_and_different_query_misses():
+    _store([1.0, 0.0, 0.0], "jawaban A")
+
+    assert answer_cache.lookup([0.99, 0.01, 0.0]) == "jawaban A"
+    assert answer_cache.lookup([0.0, 1.0, 0.0]) is None
+
+
+def test_expired_entry_is_evicted(clock):
+    _store([1.0, 0.0, 0.0], "jawaban A")
+    clock[0] += 61
+
+    assert answer_cache.lookup([1.0, 0.0, 0.0]) is None
+    assert not answer_cache._entries
+
+
+def test_expired_best_match_does_not_hide_live_match(clock):
+    _store([1.0, 0.0, 0.0], "lama")
+    clock[0] += 30
+    _store([1.0, 0.05, 0.0], "baru")
+    clock[0] += 31  # hanya entri pertama (paling mirip dengan query) yang kedaluwarsa
+
+    assert answer_cache.lookup([1.0, 0.0, 0.0]) == "baru"
+
+
+def test_least_recently_used_slot_is_replaced_when_full():
+    _store([1.0, 0.0, 0.0], "A")
+    _store([0.0, 1.0, 0.0], "B")
+    _store([0.0, 0.0, 1.0], "C")
+    assert answer_cache.lookup([1.0, 0.0, 0.0]) == "A"  # A baru dipakai, B jadi yang terlama
+
+    _store([1.0, 1.0, 0.0], "D")
+
+    assert answer_cache.lookup([0.0, 1.0, 0.0]) is None
+    assert answer_cache.lookup([1.0, 0.0, 0.0]) == "A"
+    assert answer_cache.lookup([0.0, 0.0, 1.0]) == "C"
+    assert answer_cache.lookup([1.0, 1.0, 0.0]) == "D"
+
+
+def test_clear_drops_entries_and_answers_from_older_generation():
+    generation = answer_cache.current_generation()
+    _store([1.0, 0.0, 0.0], "A")
+
+    answer_cache.clear()
+    answer_cache.store([0.0, 1.0, 0.0], "B", "B", generation)  # retrieval dimulai sebelum invalidasi
+
+    assert answer_cache.lookup([1.0, 0.0, 0.0]) is None
+    assert answer_cache.lookup([0.0, 1.0, 0.0]) is None
@@ -0,0 +1,110 @@
+import json
+import os
+import pytest
+from langchain_core.documents import Document
+import vector_store
+from faiss_storage import load_store, close_store
+
+
+def _doc(doc_id, text):
+    return Document(page_content=text, metadata={"doc_id": doc_id, "source_type": "Data Teks"})
+
+
+@pytest.fixture
+def index(tmp_path, fake_embeddings):
+    index_path = str(tmp_path / "faiss_index_test")
+
+    def run(documents, **kwargs):
+        fake_embeddings.embedded.clear()
+        return "".join(vector_store._create_specific_index(iter(documents), index_path, "Test", fake_embeddings, **kwargs))
+
+    def manifest():
+        with open(os.path.join(index_path, vector_store.MANIFEST_FILENAME), encoding="utf-8") as f:
+            return json.load(f)
+
+    def contents():
+        store = load_store(index_path, fake_embeddings)
+        try:
+            return sorted(store.docstore.search(doc_id).page_content for doc_id in store.index_to_docstore_id.values())
+        finally:
+            close_store(store)
+
+    run.path, run.manifest, run.contents = index_path, manifest, contents
+    return run
+
+
+def test_first_build_embeds_every_record(index, fake_embeddings):
+    index([_doc("a", "alpha satu"), _doc("b", "beta dua"), _doc("c", "gamma tiga")])
+
+    assert sorted(fake_embeddings.embedded) == ["alpha satu", "beta dua", "gamma tiga"]
+    assert set(index.manifest()) == {"a", "b", "c"}
+    assert index.contents() == ["alpha satu", "beta dua", "gamma tiga"]
+
+
+def test_unchanged_records_are_not_reembedded(index, fake_embeddings):
+    docs = [_doc("a", "alpha satu"), _doc("b", "beta dua")]
+    index(docs)
+    manifest_before = index.manifest()
+
+    log = index(docs)
+
+    assert fake_embeddings.embedded == []
+    assert "tidak berubah" in log
+    assert index.manifest() == manifest_before
+
+
+def test_changed_new_and_deleted_records(index, fake_embeddings):
+    index([_doc("a", "alpha satu"), _doc("b", "beta dua"), _doc("c", "gamma tiga")])
+    old_manifest = index.manifest()
+
+    log = index([_doc("a", "alpha satu"), _doc("b", "beta dua diperbarui"), _doc("d", "delta empat")])
+
+    # Hanya record berubah (b) dan baru (d) yang di-embed
+    assert sorted(fake_embeddings.embedded) == ["beta dua diperbarui", "delta empat"]
+    assert "1 baru, 1 berubah, 1 dihapus" in log
+    manifest = index.manifest()
+    assert set(manifest) == {"a", "b", "d"}
+    assert manifest["a"] == old_manifest["a"]
+    assert manifest["b"]["hash"] != old_manifest["b"]["hash"]
+    # Vektor versi lama b dan milik c yang dihapus ikut dibuang dari indeks
+    assert index.contents() == ["alpha satu", "beta dua diperbarui", "delta empat"]
+
+
+def test_partial_sync_only_touches_given_ids(index, fake_embeddings):
+    index([_doc("a", "alpha satu"), _doc("b", "beta dua")])
+
+    index([_doc("b", "beta baru")], only_ids={"a", "b"})
+
+    assert fake_embeddings.embedded == ["beta baru"]
+    assert set(index.manifest()) == {"b"}
+    assert index.contents() == ["beta baru"]
+
+
+def test_full_rebuild_reembeds_everything(index, fake_embeddings):
+    docs = [_doc("a", "alpha satu"), _doc("b", "beta dua")]
+    index(docs)
+
+    index(docs, full_rebuild=True)
+
+    assert sorted(fake_embeddings.embedded) == ["alpha satu", "beta dua"]
+    assert index.contents() == ["alpha satu", "beta dua"]
+
+
+def test_missing_manifest_falls_back_to_full_build(index, fake_embeddings):
+    docs = [_doc("a", "alpha satu"), _doc("b", "beta dua")]
+    index(docs)
+    os.remove(os.path.join(index.path, vector_store.MANIFEST_FILENAME))
+
+    log = index(docs)
+
+    assert "dibangun ulang penuh" in log
+    assert sorted(fake_embeddings.embedded) == ["alpha satu", "beta dua"]
+    assert index.contents() == ["alpha satu", "beta dua"]
+
+
+def test_all_records_deleted_removes_index(index):
+    index([_doc("a", "alpha satu")])
+
+    index([])
+
+    assert not os.path.exists(index.path)
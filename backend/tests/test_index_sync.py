@@ -0,0 +1,87 @@
+import time
+import threading
+import pytest
+import jobs
+import index_sync
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("kondisi tidak tercapai sebelum batas waktu")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    """Menggantikan sync_indexes; mengembalikan daftar batch yang diterapkan."""
+    batches = []
+
+    def fake_sync_indexes(batch):
+        batches.append(batch)
+        yield "ok"
+
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(index_sync, "_pending", {})
+    monkeypatch.setattr(index_sync, "_sync_job_id", None)
+    monkeypatch.setattr(index_sync, "INDEX_SYNC_MODE", "queue")
+    monkeypatch.setattr(index_sync, "INDEX_SYNC_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(index_sync, "sync_indexes", fake_sync_indexes)
+    return batches
+
+
+def _idle():
+    return index_sync._sync_job_id is None and not index_sync._pending
+
+
+def test_changes_are_batched_per_collection(synced):
+    index_sync.enqueue("manual_data", "a")
+    index_sync.enqueue("manual_data", "b")
+    index_sync.enqueue("scraped_data")
+    index_sync.enqueue("bug_reports", "x")  # bukan koleksi pengetahuan
+
+    _wait_until(_idle)
+    assert synced == [{"manual_data": {"a", "b"}, "scraped_data": None}]
+
+
+def test_change_queued_while_job_finishes_gets_new_job(synced, monkeypatch):
+    finish = jobs._finish
+    raced = threading.Event()
+
+    def finish_after_late_change(job, *args, **kwargs):
+        # Perubahan masuk setelah job mengosongkan antrian tetapi sebelum statusnya final
+        if job["type"] == "sync" and not raced.is_set():
+            raced.set()
+            index_sync.enqueue("manual_data", "late")
+        return finish(job, *args, **kwargs)
+
+    monkeypatch.setattr(jobs, "_finish", finish_after_late_change)
+    index_sync.enqueue("manual_data", "first")
+
+    _wait_until(lambda: len(synced) == 2 and _idle())
+    assert synced == [{"manual_data": {"first"}}, {"manual_data": {"late"}}]
+
+
+def test_cancelled_batch_returns_to_queue(synced, monkeypatch):
+    started = threading.Event()
+
+    def slow_sync_indexes(batch):
+        synced.append(batch)
+        started.set()
+        while True:
+            yield "bekerja"
+            time.sleep(0.01)
+
+    monkeypatch.setattr(index_sync, "sync_indexes", slow_sync_indexes)
+    monkeypatch.setattr(jobs, "JOB_FLUSH_SECONDS", 0)
+    index_sync.enqueue("memory_bank", "q1")
+    assert started.wait(5)
+    job_id = index_sync._sync_job_id
+
+    jobs.cancel(job_id)
+
+    _wait_until(lambda: jobs.get(job_id)["status"] == "cancelled")
+    # Batch dikembalikan ke antrian, tetapi tidak dijalankan ulang otomatis setelah dibatalkan
+    assert index_sync._pending == {"memory_bank": {"q1"}}
+    assert index_sync._sync_job_id is None
@@ -0,0 +1,129 @@
+import time
+import datetime
+import threading
+import pytest
+import jobs
+
+
+def _wait_for_status(job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while jobs.get(job_id)["status"] not in statuses:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"job {job_id} masih {jobs.get(job_id)['status']}")
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+
+@pytest.fixture(autouse=True)
+def local_jobs(monkeypatch):
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "JOB_FLUSH_SECONDS", 0)
+
+
+@pytest.fixture
+def blocking_job(monkeypatch):
+    """Tipe job "test_block": menulis log sampai `release` diset; `closed` diset saat generatornya ditutup."""
+    state = {"release": threading.Event(), "started": threading.Event(), "closed": threading.Event()}
+
+    def runner(params):
+        state["started"].set()
+        try:
+            while not state["release"].is_set():
+                yield "menunggu"
+                time.sleep(0.01)
+            yield "selesai"
+        finally:
+            state["closed"].set()
+
+    monkeypatch.setitem(jobs._job_types, "test_block", runner)
+    yield state
+    state["release"].set()
+
+
+def test_job_logs_are_paged_with_since(monkeypatch):
+    monkeypatch.setitem(jobs._job_types, "test_lines", lambda params: iter(["satu", "dua\ntiga"]))
+    job_id, created = jobs.submit("test_lines")
+
+    job = _wait_for_status(job_id, {"succeeded"})
+
+    assert created
+    assert job["logs"] == ["satu", "dua", "tiga"]
+    assert job["next_since"] == 3
+    assert jobs.get(job_id, since=2)["logs"] == ["tiga"]
+
+
+def test_active_job_of_same_type_is_reused(blocking_job):
+    job_id, created = jobs.submit("test_block")
+    again_id, created_again = jobs.submit("test_block")
+
+    assert created and not created_again
+    assert again_id == job_id
+
+
+def test_cancel_closes_running_job(blocking_job):
+    job_id, _ = jobs.submit("test_block")
+    assert blocking_job["started"].wait(5)
+
+    assert jobs.cancel(job_id)
+
+    job = _wait_for_status(job_id, {"cancelled", "succeeded", "failed"})
+    assert job["status"] == "cancelled"
+    assert job["logs"][-1] == "Job dibatalkan oleh admin."
+    assert blocking_job["closed"].is_set()
+    assert not jobs.is_active(job_id)
+
+
+def test_cancel_before_start_skips_runner(blocking_job, monkeypatch):
+    ran = []
+    monkeypatch.setitem(jobs._job_types, "test_other", lambda params: ran.append(True) or iter(["jalan"]))
+    first_id, _ = jobs.submit("test_block")
+    assert blocking_job["started"].wait(5)
+    queued_id, _ = jobs.submit("test_other")  # antri di belakang job pertama (satu thread job)
+
+    jobs.cancel(queued_id)
+    blocking_job["release"].set()
+
+    job = _wait_for_status(queued_id, {"cancelled", "succeeded"})
+    assert job["status"] == "cancelled"
+    assert job["logs"] == ["Job dibatalkan sebelum dimulai."]
+    assert ran == []
+    assert _wait_for_status(first_id, {"succeeded"})["status"] == "succeeded"
+
+
+def test_failed_job_records_error(monkeypatch):
+    def runner(params):
+        yield "mulai"
+        raise RuntimeError("rusak")
+
+    monkeypatch.setitem(jobs._job_types, "test_fail", runner)
+    job_id, _ = jobs.submit("test_fail")
+
+    job = _wait_for_status(job_id, {"failed"})
+    assert job["error"] == "rusak"
+    assert job["logs"] == ["mulai", "ERROR: rusak"]
+
+
+def test_finish_hook_runs_after_final_status(monkeypatch):
+    seen = []
+    monkeypatch.setitem(jobs._job_types, "test_hook", lambda params: iter(["ok"]))
+    monkeypatch.setitem(jobs._finish_hooks, "test_hook",
+                        lambda job_id, status: seen.append((job_id, status, jobs.is_active(job_id))))
+    job_id, _ = jobs.submit("test_hook")
+
+    _wait_for_status(job_id, {"succeeded"})
+
+    assert seen == [(job_id, "succeeded", False)]
+
+
+def test_job_from_dead_worker_is_reported_lost(monkeypatch):
+    now = datetime.datetime.utcnow()
+    stored = {
+        "stale": {"id": "stale", "status": "running", "logs": ["a"], "log_count": 1,
+                  "updated_at": now - datetime.timedelta(seconds=jobs.JOB_STALE_SECONDS + 5)},
+        "fresh": {"id": "fresh", "status": "running", "logs": [], "log_count": 0, "updated_at": now},
+    }
+    monkeypatch.setattr(jobs, "get_job_by_id", lambda job_id: dict(stored[job_id]) if job_id in stored else None)
+
+    assert jobs.get("stale")["status"] == "lost"
+    assert jobs.get("fresh")["status"] == "running"
+    assert jobs.get("unknown") is None
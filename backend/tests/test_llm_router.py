@@ -0,0 +1,157 @@
+import time
+import pytest
+import llm_router
+from llm_providers import _Provider
+
+
+class FakeProvider(_Provider):
+    """Penyedia dengan skenario tetap: jeda sebelum potongan pertama, gagal di awal/tengah, atau tanpa teks."""
+
+    def __init__(self, name, texts=("halo",), delay=0.0, fail=False, fail_after_first=False, usage_first=False):
+        self.name = name
+        self.model = f"{name}-model"
+        self.texts = texts
+        self.delay = delay
+        self.fail = fail
+        self.fail_after_first = fail_after_first
+        self.usage_first = usage_first
+        self.calls = 0
+
+    def _stream(self, prompt, history):
+        self.calls += 1
+        usage = {"usage": {"prompt": 1, "completion": len(self.texts), "total": 1 + len(self.texts)}}
+        if self.usage_first:
+            yield usage
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} tidak tersedia")
+        for i, text in enumerate(self.texts):
+            yield {"text": text}
+            if self.fail_after_first and i == 0:
+                raise RuntimeError(f"{self.name} terputus")
+        if not self.usage_first:
+            yield usage
+
+
+@pytest.fixture(autouse=True)
+def router_config(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_ROUTING", "priority")
+    monkeypatch.setattr(llm_router, "LLM_CIRCUIT_FAILURES", 2)
+    monkeypatch.setattr(llm_router, "LLM_CIRCUIT_OPEN_SECONDS", 30)
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_AFTER_MS", 0)
+
+
+def _run(router):
+    return list(router.generate("pertanyaan", [], stream=True))
+
+
+def _texts(chunks):
+    return "".join(chunk.get("text", "") for chunk in chunks)
+
+
+def _health(router, name):
+    return next(h for h in router.health() if h["name"] == name)
+
+
+def test_failover_before_first_token():
+    router = llm_router.LLMRouter([FakeProvider("a", fail=True), FakeProvider("b", texts=("ja", "wab"))])
+
+    chunks = _run(router)
+
+    assert "beralih ke 'b'" in chunks[0]["notice"]
+    assert {"provider": "b", "model": "b-model"} in chunks
+    assert _texts(chunks) == "jawab"
+    assert chunks[-1]["model"] == "b-model"
+    assert _health(router, "a")["failures"] == 1
+
+
+def test_failure_after_first_token_is_not_retried():
+    backup = FakeProvider("b")
+    router = llm_router.LLMRouter([FakeProvider("a", texts=("se", "bagian"), fail_after_first=True), backup])
+
+    with pytest.raises(RuntimeError, match="terputus"):
+        _run(router)
+    assert backup.calls == 0
+
+
+def test_circuit_opens_then_allows_single_half_open_probe():
+    flaky, backup = FakeProvider("a", fail=True), FakeProvider("b")
+    router = llm_router.LLMRouter([flaky, backup])
+    _run(router)
+    _run(router)
+    assert _health(router, "a")["circuit"] == "open"
+
+    _run(router)
+    assert flaky.calls == 2  # dilewati selama circuit terbuka
+
+    router._health["a"].open_until = 0.0  # masa jeda habis -> half-open
+    flaky.fail = False
+    probe = router.generate("pertanyaan", [], stream=True)
+    assert next(probe) == {"provider": "a", "model": "a-model"}
+
+    # Selama percobaan berjalan, request lain tetap melewati penyedia ini
+    assert _texts(_run(router)) == "halo"
+    assert flaky.calls == 3
+
+    assert _texts(list(probe)) == "halo"
+    assert _health(router, "a")["circuit"] == "closed"
+    assert not _health(router, "a")["probe_in_flight"]
+
+
+def test_failed_probe_reopens_circuit():
+    router = llm_router.LLMRouter([FakeProvider("a", fail=True), FakeProvider("b")])
+    _run(router)
+    _run(router)
+    router._health["a"].open_until = 0.0
+
+    assert _texts(_run(router)) == "halo"
+
+    health = _health(router, "a")
+    assert health["circuit"] == "open" and not health["probe_in_flight"]
+
+
+def test_hedging_uses_fastest_provider(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_AFTER_MS", 50)
+    router = llm_router.LLMRouter([FakeProvider("lambat", delay=1.0), FakeProvider("cepat", texts=("cepat",))])
+
+    started = time.monotonic()
+    chunks = _run(router)
+
+    assert time.monotonic() - started < 0.8
+    assert "dijalankan bersamaan" in chunks[0]["notice"]
+    assert {"provider": "cepat", "model": "cepat-model"} in chunks
+    assert _texts(chunks) == "cepat"
+
+
+def test_hedging_winner_is_first_provider_with_text(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_AFTER_MS", 50)
+    # "a" langsung mengirim usage tetapi teksnya baru datang jauh setelah "b" menjawab
+    router = llm_router.LLMRouter([FakeProvider("a", texts=("lambat",), delay=0.5, usage_first=True),
+                                   FakeProvider("b", texts=("cepat",))])
+
+    chunks = _run(router)
+
+    assert _texts(chunks) == "cepat"
+    assert {"provider": "b", "model": "b-model"} in chunks
+    assert all(chunk.get("model") != "a-model" for chunk in chunks)
+
+
+def test_hedging_treats_empty_answer_as_failure(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_AFTER_MS", 200)
+    router = llm_router.LLMRouter([FakeProvider("kosong", texts=(), usage_first=True), FakeProvider("b", texts=("isi",))])
+
+    chunks = _run(router)
+
+    assert "tanpa teks jawaban" in chunks[0]["notice"]
+    assert _texts(chunks) == "isi"
+    assert _health(router, "kosong")["failures"] == 1
+
+
+def test_non_stream_generate_reports_answering_model():
+    router = llm_router.LLMRouter([FakeProvider("a", fail=True), FakeProvider("b", texts=("ja", "wab"))])
+
+    result = router.generate("pertanyaan", [])
+
+    assert result["text"] == "jawab"
+    assert result["model"] == "b-model"
+    assert result["usage"]["total"] == 3
@@ -0,0 +1,93 @@
+import pytest
+import prompt_builder
+from prompt_builder import ChatPrompt, dedupe_documents, estimate_tokens, trim_history, TRUNCATION_MARK
+
+
+def _msg(role, text):
+    return {"role": role, "parts": [{"text": text}]}
+
+
+def _doc(title, content, source_type="Memory Bank"):
+    return {"source_type": source_type, "title": title, "source": title, "content": content}
+
+
+def _words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+@pytest.fixture(autouse=True)
+def prompt_config(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "PROMPT_CHARS_PER_TOKEN", 4.0)
+    monkeypatch.setattr(prompt_builder, "PROMPT_HISTORY_TOKENS", 1500)
+    monkeypatch.setattr(prompt_builder, "PROMPT_HISTORY_MESSAGE_TOKENS", 50)
+
+
+def test_trim_history_keeps_newest_messages_within_budget():
+    history = [_msg("user", "a" * 80), _msg("model", "b" * 80), _msg("user", "c" * 80), _msg("model", "d" * 80)]
+
+    trimmed = trim_history(history, 60)
+
+    # 20 token per pesan: tiga pesan terbaru muat, lalu awalan "model" dibuang agar diawali pesan pengguna
+    assert [msg["parts"][0]["text"][0] for msg in trimmed] == ["c", "d"]
+    assert trimmed[0]["role"] == "user"
+
+
+def test_trim_history_truncates_long_messages():
+    trimmed = trim_history([_msg("user", _words("kata", 200))], 1000)
+
+    text = trimmed[0]["parts"][0]["text"]
+    assert text.endswith(TRUNCATION_MARK)
+    assert estimate_tokens(text) <= 50
+
+
+def test_trim_history_empty_when_nothing_fits():
+    assert trim_history([_msg("user", "x" * 400)], 10) == []
+
+
+def test_dedupe_drops_lower_priority_duplicates():
+    text = _words("jadwal", 40)
+    items = [_doc("memory", text), _doc("scraped", text + " tambahan", "Website Scraping"), _doc("kosong", "   ")]
+
+    kept, dropped = dedupe_documents(items)
+
+    assert [item["title"] for item in kept] == ["memory"]
+    assert dropped == 2
+
+
+def test_dedupe_removes_overlap_between_neighbouring_chunks():
+    first = _words("awal", 20) + " bagian yang tumpang tindih antar potongan"
+    second = "bagian yang tumpang tindih antar potongan " + _words("lanjut", 20)
+
+    kept, dropped = dedupe_documents([_doc("1", first), _doc("2", second)])
+
+    assert dropped == 0
+    assert kept[1]["content"] == _words("lanjut", 20)
+
+
+def test_prompt_respects_each_provider_budget(monkeypatch):
+    fixed = estimate_tokens(prompt_builder.PROMPT_TEMPLATE.format(context=prompt_builder.NO_CONTEXT_TEXT, user_query="tanya"))
+    monkeypatch.setattr(prompt_builder, "LLM_PROMPT_TOKEN_BUDGETS", {"default": fixed + 2000, "kecil": fixed + 300})
+    documents = [_doc(f"doc{i}", _words(f"d{i}x", 150)) for i in range(6)]
+    history = [_msg("user" if i % 2 == 0 else "model", _words(f"h{i}y", 30)) for i in range(8)]
+    prompt = ChatPrompt("tanya", documents, history)
+
+    big, small = prompt.stats("besar"), prompt.stats("kecil")
+
+    for stats in (big, small):
+        assert stats["prompt_tokens"] + stats["history_tokens"] <= stats["budget"]
+    assert small["documents"] < big["documents"]
+    assert small["history_messages"] <= big["history_messages"]
+    assert small["documents_dropped"] + small["documents"] == 6
+    # Dokumen diisi sesuai urutan prioritas: yang dibuang selalu yang paling akhir
+    text, _ = prompt.for_provider("kecil")
+    assert "doc0" in text and "doc5" not in text
+
+
+def test_prompt_is_built_once_per_budget(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "LLM_PROMPT_TOKEN_BUDGETS", {"default": 8000, "groq": 5000})
+    prompt = ChatPrompt("tanya", [_doc("doc", "isi dokumen")], [])
+
+    assert prompt.for_provider("gemini") is not None
+    assert prompt.for_provider("gemini") == prompt.for_provider("stub")
+    assert prompt.stats("groq")["budget"] == 5000
+    assert len(prompt._built) == 2
@@ -0,0 +1,78 @@
+import pytest
+import database
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def changes(monkeypatch):
+    """MongoDB tiruan di memori; mengembalikan daftar notifikasi perubahan data pengetahuan."""
+    monkeypatch.setattr(database, "db", mongomock.MongoClient()[database.DB_NAME])
+    monkeypatch.setattr(database, "_db_available", True)
+    notified = []
+    monkeypatch.setattr(database, "_change_listeners", [lambda *change: notified.append(change)])
+    return notified
+
+
+def _stored(url):
+    return database.db.scraped_data.find_one({"url": url})
+
+
+def test_new_page_is_stored_and_notified(changes):
+    result = database.add_scraped_data("https://sekolah.sch.id/a", "A", "isi", None, etag='"v1"',
+                                       content_hash="h1", body_hash="b1", links=["https://sekolah.sch.id/b"])
+
+    assert result == "new"
+    doc = _stored("https://sekolah.sch.id/a")
+    assert doc["content"] == "isi" and doc["etag"] == '"v1"' and doc["links"] == ["https://sekolah.sch.id/b"]
+    assert changes == [("scraped_data", "upsert", str(doc["_id"]))]
+
+
+def test_unchanged_content_only_refreshes_validators(changes):
+    database.add_scraped_data("https://sekolah.sch.id/a", "A", "isi", None, etag='"v1"', content_hash="h1")
+    before = _stored("https://sekolah.sch.id/a")
+    changes.clear()
+
+    result = database.add_scraped_data("https://sekolah.sch.id/a", "A", "isi", None, etag='"v2"', content_hash="h1")
+
+    assert result == "unchanged"
+    after = _stored("https://sekolah.sch.id/a")
+    assert after["etag"] == '"v2"'
+    assert after["scraped_at"] == before["scraped_at"]
+    assert changes == []
+
+
+def test_changed_content_is_replaced_and_keeps_crawl_links(changes):
+    database.add_scraped_data("https://sekolah.sch.id/a", "A", "lama", None, content_hash="h1",
+                              links=["https://sekolah.sch.id/b"])
+    changes.clear()
+
+    # Scrape dari file tidak membawa links: links hasil crawl sebelumnya tetap disimpan
+    result = database.add_scraped_data("https://sekolah.sch.id/a", "A baru", "baru", None, content_hash="h2")
+
+    assert result == "changed"
+    doc = _stored("https://sekolah.sch.id/a")
+    assert doc["content"] == "baru" and doc["content_hash"] == "h2"
+    assert doc["links"] == ["https://sekolah.sch.id/b"]
+    assert changes == [("scraped_data", "upsert", str(doc["_id"]))]
+    assert database.db.scraped_data.count_documents({}) == 1
+
+
+def test_page_states_and_not_modified_marks(changes):
+    database.add_scraped_data("https://sekolah.sch.id/a", "A", "isi", None, etag='"v1"',
+                              last_modified="Mon, 01 Jan 2024 00:00:00 GMT", content_hash="h1", body_hash="b1")
+
+    database.mark_scraped_unchanged("https://sekolah.sch.id/a", etag='"v2"')
+
+    state = database.get_scraped_page_states()["https://sekolah.sch.id/a"]
+    assert state["etag"] == '"v2"'
+    assert state["last_modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert state["body_hash"] == "b1"
+
+
+def test_offline_database_returns_none(monkeypatch):
+    monkeypatch.setattr(database, "db", None)
+    monkeypatch.setattr(database, "_db_available", False)
+
+    assert database.add_scraped_data("https://sekolah.sch.id/a", "A", "isi", None, content_hash="h1") is None
+    assert database.get_scraped_page_states() == {}
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pytest
+from faiss_storage import new_store, save_store, load_store, close_store
+from unified_index import build_unified_index, load_unified_index, search_unified, read_built_from, _source_ranges
+
+SOURCE_KEYS = ["memory", "manual_text", "document", "scraped"]
+
+
+@pytest.fixture
+def make_store(fake_embeddings):
+    """Menyimpan indeks per sumber berisi `texts` di `path` lalu membukanya seperti _build_unified."""
+    opened = []
+
+    def make(path, texts):
+        store = new_store(path, fake_embeddings, fake_embeddings.dimension)
+        store.add_texts(texts, metadatas=[{"text": text} for text in texts], ids=[f"{path}:{i}" for i in range(len(texts))])
+        save_store(store, path)
+        store = load_store(path, fake_embeddings, master=True)
+        opened.append(store)
+        return store
+
+    yield make
+    for store in opened:
+        close_store(store)
+
+
+def _contents(unified):
+    return [unified["docstore"].search(str(i)).page_content for i in range(len(unified["sources"]))]
+
+
+def test_build_groups_vectors_by_source_priority(tmp_path, make_store, fake_embeddings):
+    scraped = make_store(str(tmp_path / "scraped"), ["halaman web", "berita kampus"])
+    memory = make_store(str(tmp_path / "memory"), ["jawaban tersimpan"])
+
+    total = build_unified_index([(3, scraped), (0, memory)], str(tmp_path / "unified"))
+
+    unified = load_unified_index(str(tmp_path / "unified"))
+    assert total == 3
+    assert unified["sources"].tolist() == [0, 3, 3]
+    assert _contents(unified) == ["jawaban tersimpan", "halaman web", "berita kampus"]
+    expected = np.array(fake_embeddings.embed_documents(["jawaban tersimpan", "halaman web", "berita kampus"]), dtype=np.float32)
+    np.testing.assert_allclose(unified["vectors"], expected, rtol=1e-6)
+
+
+def test_search_takes_quota_per_source_and_applies_weights(tmp_path, make_store, fake_embeddings):
+    memory = make_store(str(tmp_path / "memory"), ["jadwal ujian semester", "biaya kuliah"])
+    scraped = make_store(str(tmp_path / "scraped"), ["jadwal ujian semester", "lokasi kampus"])
+    build_unified_index([(0, memory), (3, scraped)], str(tmp_path / "unified"))
+    unified = load_unified_index(str(tmp_path / "unified"))
+    query = fake_embeddings.embed_query("jadwal ujian")
+
+    results = search_unified(unified, query, 1, SOURCE_KEYS)
+    assert [doc.page_content for doc in results["memory"]["docs"]] == ["jadwal ujian semester"]
+    assert [doc.page_content for doc in results["scraped"]["docs"]] == ["jadwal ujian semester"]
+    assert results["manual_text"] is None and results["document"] is None
+
+    # Jarak kedua sumber sama (> 0): bobot lebih kecil (prioritas lebih tinggi) yang lolos batas total
+    results = search_unified(unified, query, 1, SOURCE_KEYS, {"memory": 1.0, "scraped": 0.5}, max_total=1)
+    assert results["memory"]["docs"] == []
+    assert [doc.page_content for doc in results["scraped"]["docs"]] == ["jadwal ujian semester"]
+
+
+def test_build_records_source_fingerprints(tmp_path, make_store):
+    memory = make_store(str(tmp_path / "memory"), ["jawaban tersimpan"])
+    built_from = {"memory": [1, 2, 3], "manual_text": None, "document": None, "scraped": None}
+
+    build_unified_index([(0, memory)], str(tmp_path / "unified"), built_from)
+
+    assert read_built_from(str(tmp_path / "unified")) == built_from
+
+
+def test_build_without_vectors_removes_unified_index(tmp_path, make_store):
+    unified_path = str(tmp_path / "unified")
+    build_unified_index([(0, make_store(str(tmp_path / "memory"), ["jawaban tersimpan"]))], unified_path)
+
+    assert build_unified_index([(0, None), (3, None)], unified_path) == 0
+    assert not os.path.exists(unified_path)
+    assert read_built_from(unified_path) is None
+
+
+def test_source_ranges_are_contiguous_slices():
+    assert _source_ranges(np.array([0, 0, 2, 2, 2, 3], dtype=np.uint8)) == {0: (0, 2), 1: (2, 2), 2: (2, 5), 3: (5, 6)}
+    assert _source_ranges(np.array([], dtype=np.uint8)) == {}
+
+
+def test_rebuild_copies_unchanged_sources(tmp_path, make_store):
+    unified_path = str(tmp_path / "unified")
+    memory = make_store(str(tmp_path / "memory"), ["jawaban tersimpan", "jawaban kedua"])
+    manual = make_store(str(tmp_path / "manual"), ["teks lama"])
+    build_unified_index([(0, memory), (1, manual)], unified_path)
+    before = load_unified_index(unified_path)
+    memory_vectors = np.array(before["vectors"][:2])
+    before["docstore"].close(commit=False)
+
+    # Hanya manual_text yang berubah; blok memory disalin dari indeks gabungan lama
+    manual = make_store(str(tmp_path / "manual"), ["teks baru", "teks tambahan"])
+    scraped = make_store(str(tmp_path / "scraped"), ["halaman web"])
+    total = build_unified_index([(1, manual), (3, scraped)], unified_path, reuse={0, 2})
+
+    unified = load_unified_index(unified_path)
+    assert total == 5
+    assert unified["sources"].tolist() == [0, 0, 1, 1, 3]
+    assert _contents(unified) == ["jawaban tersimpan", "jawaban kedua", "teks baru", "teks tambahan", "halaman web"]
+    np.testing.assert_array_equal(unified["vectors"][:2], memory_vectors)
+
+
+def test_build_unified_skips_or_reuses_by_fingerprint(make_store, fake_embeddings):
+    import vector_store
+    paths = {key: path for key, path, _ in vector_store.SOURCES}
+    make_store(paths["memory"], ["jawaban tersimpan"])
+    make_store(paths["scraped"], ["halaman web"])
+
+    log = "".join(vector_store._build_unified(fake_embeddings))
+    assert "2 potongan" in log
+
+    log = "".join(vector_store._build_unified(fake_embeddings))
+    assert "tidak berubah" in log
+
+    make_store(paths["scraped"], ["halaman web", "halaman baru"])
+    log = "".join(vector_store._build_unified(fake_embeddings))
+    assert "1 sumber disusun ulang" in log
+    unified = load_unified_index(vector_store.FAISS_UNIFIED_PATH)
+    assert _contents(unified) == ["jawaban tersimpan", "halaman web", "halaman baru"]
+    unified["docstore"].close(commit=False)
+
+    log = "".join(vector_store._build_unified(fake_embeddings, force=True))
+    assert "4 sumber disusun ulang, 0 disalin" in log
@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import numpy as np
+from faiss_storage import SQLiteDocstore, DOCSTORE_FILENAME
+
+# --- Indeks gabungan (mode VECTOR_INDEX_MODE=unified) ---
+# Satu matriks vektor float32 yang dikelompokkan per sumber (urutan prioritas), satu array
+# uint8 kode sumber per vektor, dan docstore SQLite dengan kunci = posisi vektor (tanpa pickle).
+# Kedua file .npy dibaca dengan mmap sehingga semua worker berbagi page cache yang sama.
+VECTORS_FILENAME = "vectors.npy"
+SOURCES_FILENAME = "sources.npy"
+# Sidik indeks per sumber saat indeks gabungan terakhir disusun; jika sama, penyusunan ulang dilewati
+BUILT_FROM_FILENAME = "built_from.json"
+
+
+def _save_npy(path, array):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def read_built_from(unified_path):
+    """Sidik indeks sumber yang tercatat pada indeks gabungan di disk (None jika belum ada)."""
+    try:
+        with open(os.path.join(unified_path, BUILT_FROM_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _source_ranges(sources):
+    """Vektor sudah dikelompokkan per sumber, jadi tiap sumber adalah satu irisan [awal, akhir)."""
+    codes = np.arange(int(sources.max()) + 2, dtype=np.uint8) if len(sources) else np.zeros(1, dtype=np.uint8)
+    bounds = np.searchsorted(sources, codes)
+    return {int(code): (int(bounds[code]), int(bounds[code + 1])) for code in codes[:-1]}
+
+
+def build_unified_index(split_stores, unified_path, built_from=None, reuse=()):
+    """Menyusun indeks gabungan dari indeks FAISS per sumber.
+
+    split_stores: list [(kode_sumber, FAISS store atau None)] untuk sumber yang disusun ulang.
+    Vektor direkonstruksi dari indeks masing-masing, jadi tidak ada embedding ulang.
+    reuse: kode sumber yang tidak berubah; blok vektor dan dokumennya disalin dari indeks gabungan
+    yang ada (irisan array + INSERT ... SELECT di SQLite) tanpa membuka indeks sumbernya.
+    built_from: sidik indeks sumber yang dicatat setelah semua file selesai ditulis.
+    Mengembalikan jumlah vektor yang ditulis.
+    """
+    docstore_file = os.path.join(unified_path, DOCSTORE_FILENAME)
+    blocks = [(code, store) for code, store in split_stores if store is not None and store.index.ntotal > 0]
+    old_vectors, old_ranges = None, {}
+    if reuse:
+        old_vectors = np.load(os.path.join(unified_path, VECTORS_FILENAME), mmap_mode="r")
+        old_ranges = _source_ranges(np.load(os.path.join(unified_path, SOURCES_FILENAME), mmap_mode="r"))
+        blocks += [(code, None) for code in reuse if code in old_ranges and old_ranges[code][1] > old_ranges[code][0]]
+    blocks.sort(key=lambda block: block[0])
+    if not blocks:
+        if os.path.exists(unified_path):
+            shutil.rmtree(unified_path)
+        return 0
+
+    os.makedirs(unified_path, exist_ok=True)
+    # Dihapus dulu: jika penyusunan terhenti di tengah, penyusunan berikutnya tidak akan dilewati
+    built_from_file = os.path.join(unified_path, BUILT_FROM_FILENAME)
+    if os.path.exists(built_from_file):
+        os.remove(built_from_file)
+    if os.path.exists(docstore_file + ".tmp"):
+        os.remove(docstore_file + ".tmp")
+    docstore = SQLiteDocstore(docstore_file + ".tmp", readonly=False)
+
+    vector_blocks, source_blocks, position = [], [], 0
+    for code, store in blocks:
+        if store is None:
+            start, end = old_ranges[code]
+            ntotal = end - start
+            vector_blocks.append(np.array(old_vectors[start:end], dtype=np.float32))
+            docstore.copy_range(docstore_file, start, end, position - start)
+        else:
+            ntotal = store.index.ntotal
+            vector_blocks.append(store.index.reconstruct_n(0, ntotal).astype(np.float32))
+            docstore.add({
+                str(position + i): store.docstore.search(store.index_to_docstore_id[i])
+                for i in range(ntotal)
+            })
+        source_blocks.append(np.full(ntotal, code, dtype=np.uint8))
+        position += ntotal
+
+    docstore.close(commit=True)
+    del old_vectors  # lepaskan mmap file lama sebelum diganti
+    _save_npy(os.path.join(unified_path, VECTORS_FILENAME), np.ascontiguousarray(np.vstack(vector_blocks)))
+    _save_npy(os.path.join(unified_path, SOURCES_FILENAME), np.concatenate(source_blocks))
+    os.replace(docstore_file + ".tmp", docstore_file)
+    if built_from is not None:
+        with open(built_from_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(built_from, f)
+        os.replace(built_from_file + ".tmp", built_from_file)
+    return position
+
+
+def load_unified_index(unified_path):
+    """Memuat indeks gabungan dari disk (mmap), atau None jika belum pernah dibangun."""
+    vectors_path = os.path.join(unified_path, VECTORS_FILENAME)
+    if not os.path.exists(vectors_path):
+        return None
+    vectors = np.load(vectors_path, mmap_mode="r")
+    sources = np.load(os.path.join(unified_path, SOURCES_FILENAME), mmap_mode="r")
+    docstore = SQLiteDocstore(os.path.join(unified_path, DOCSTORE_FILENAME), readonly=True)
+
+    return {
+        "vectors": vectors,
+        "norms": np.einsum("ij,ij->i", vectors, vectors),
+        "sources": sources,
+        "ranges": _source_ranges(sources),
+        "docstore": docstore,
+    }
+
+
+def search_unified(unified, query_vector, k, source_keys, weights=None, max_total=0):
+    """Satu pencarian top-k untuk semua sumber sekaligus.
+
+    Jarak L2 kuadrat (sama dengan IndexFlatL2) dihitung dengan satu perkalian
+    matriks-vektor, lalu tiap sumber mengambil kuota k terbaiknya dari irisannya.
+    Jika max_total > 0, kandidat dipangkas lagi berdasarkan jarak x bobot prioritas.
+    Format hasil sama dengan vector_store.search_all().
+    """
+    q = np.asarray(query_vector, dtype=np.float32)
+    distances = unified["norms"] - 2.0 * (unified["vectors"] @ q) + float(q @ q)
+
+    candidates = []
+    for code, key in enumerate(source_keys):
+        start, end = unified["ranges"].get(code, (0, 0))
+        if end <= start:
+            continue
+        block = distances[start:end]
+        quota = min(k, end - start)
+        top = np.argpartition(block, quota - 1)[:quota]
+        weight = (weights or {}).get(key, 1.0)
+        for i in top:
+            candidates.append((float(block[i]) * weight, code, float(block[i]), start + int(i)))
+
+    if max_total and len(candidates) > max_total:
+        candidates = sorted(candidates)[:max_total]
+
+    results = {key: None for key in source_keys}
+    for code, key in enumerate(source_keys):
+        start, end = unified["ranges"].get(code, (0, 0))
+        if end > start:
+            results[key] = {"docs": [], "error": None}
+    # Urutan keluaran: per sumber (prioritas), lalu dari jarak terdekat
+    for _, code, _, position in sorted(candidates, key=lambda c: (c[1], c[2])):
+        results[source_keys[code]]["docs"].append(unified["docstore"].search(str(position)))
+    return results
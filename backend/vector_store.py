@@ -1,8 +1,22 @@
 import os
+import json
+import time
 import shutil
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import hashlib
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+try:
+    import fcntl
+except ImportError:  # Windows (server dev lokal): cukup satu proses penulis
+    fcntl = None
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from embedding_service import get_embeddings, document_encoder
+from faiss_storage import load_store, new_store, save_store, discard_store, close_store, INDEX_FILENAME
+from unified_index import build_unified_index, load_unified_index, search_unified, read_built_from
+import answer_cache
+import memory_lookup
+from serving import get_executor, run_blocking
+from index_registry import IndexRegistry
 from database import get_memory_documents_for_indexing, get_manual_text_documents_for_indexing, get_document_documents_for_indexing, get_scraped_documents_for_indexing
 
 # --- Konfigurasi Path untuk Empat Indeks Terpisah ---
@@ -10,120 +24,496 @@ FAISS_MEMORY_PATH = "db/faiss_index_memory"
 FAISS_MANUAL_TEXT_PATH = "db/faiss_index_manual_text"
 FAISS_DOCUMENT_PATH = "db/faiss_index_document"
 FAISS_SCRAPED_PATH = "db/faiss_index_scraped"
-# Tidak lagi memerlukan GEMINI_API_KEY karena menggunakan HuggingFaceEmbeddings lokal
+FAISS_INDEX_PATHS = [FAISS_MEMORY_PATH, FAISS_MANUAL_TEXT_PATH, FAISS_DOCUMENT_PATH, FAISS_SCRAPED_PATH]
+# Manifest per indeks: doc_id MongoDB -> hash konten + ID vektor FAISS (untuk reindex inkremental)
+MANIFEST_FILENAME = "manifest.json"
+# Tidak lagi memerlukan GEMINI_API_KEY karena menggunakan HuggingFaceEmbeddings lokal (lihat embedding_service.py)
 
-# --- FIX #4: Module-level cache so retrievers are loaded once, not per-request ---
-_cached_retrievers = None
+# Urutan prioritas sumber (sama dengan hierarki RAG di system prompt)
+SOURCES = [
+    ("memory", FAISS_MEMORY_PATH, "Memory Bank"),
+    ("manual_text", FAISS_MANUAL_TEXT_PATH, "Data Teks"),
+    ("document", FAISS_DOCUMENT_PATH, "Data Dokumen"),
+    ("scraped", FAISS_SCRAPED_PATH, "Data Scraping"),
+]
+SOURCE_LOADERS = {
+    "memory": get_memory_documents_for_indexing,
+    "manual_text": get_manual_text_documents_for_indexing,
+    "document": get_document_documents_for_indexing,
+    "scraped": get_scraped_documents_for_indexing,
+}
+# Koleksi MongoDB -> sumber indeks yang dibentuk darinya
+COLLECTION_SOURCES = {
+    "memory_bank": ["memory"],
+    "manual_data": ["manual_text", "document"],
+    "scraped_data": ["scraped"],
+}
+# Hanya satu penulis indeks pada satu waktu, juga antar worker gunicorn
+INDEX_WRITE_LOCK_FILE = "db/index_write.lock"
+# Ukuran batch pipeline indexing: potongan yang di-embed lalu ditambahkan ke indeks sekaligus
+INDEXING_BATCH_CHUNKS = int(os.getenv("INDEXING_BATCH_CHUNKS", "256"))
+
+# --- Tipe indeks FAISS per sumber (string factory FAISS), mis. "scraped=IVF{nlist},SQ8;document=HNSW32" ---
+# Default semua Flat. Factory baru dipakai setelah indeks mencapai FAISS_TRAIN_THRESHOLD potongan;
+# di bawahnya Flat lebih cepat dan tepat. Lihat benchmarks/index_factories.py untuk recall vs latensi.
+FAISS_INDEX_FACTORIES = {
+    key.strip(): factory.strip()
+    for key, factory in (
+        item.split("=", 1) for item in os.getenv("FAISS_INDEX_FACTORIES", "").split(";") if "=" in item
+    )
+}
+FAISS_TRAIN_THRESHOLD = int(os.getenv("FAISS_TRAIN_THRESHOLD", "10000"))
+
+# --- Mode indeks: "split" (empat indeks terpisah, kompatibel) atau "unified" (satu matriks gabungan) ---
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "split").lower()
+FAISS_UNIFIED_PATH = "db/faiss_index_unified"
+# Bobot prioritas (jarak x bobot, lebih kecil = lebih diutamakan) dan batas total hasil mode unified
+UNIFIED_SOURCE_WEIGHTS = {
+    key: float(weight)
+    for key, weight in (
+        item.split("=", 1) for item in os.getenv(
+            "UNIFIED_SOURCE_WEIGHTS", "memory=0.85,manual_text=0.9,document=0.95,scraped=1.0"
+        ).split(",") if "=" in item
+    )
+}
+# Dari kandidat (kuota k per sumber) hanya UNIFIED_MAX_RESULTS dengan jarak x bobot terkecil yang dipakai;
+# 0 = tanpa batas total (bobot tidak berpengaruh)
+UNIFIED_MAX_RESULTS = int(os.getenv("UNIFIED_MAX_RESULTS", "8"))
+
+# Batas waktu retrieval paralel: per sumber dan untuk seluruh fase retrieval
+RETRIEVAL_SOURCE_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_SOURCE_TIMEOUT_SECONDS", "2.0"))
+RETRIEVAL_DEADLINE_SECONDS = float(os.getenv("RETRIEVAL_DEADLINE_SECONDS", "3.0"))
 
 def invalidate_cache():
-    """Call this after reindexing or deleting FAISS indexes to force a reload."""
-    global _cached_retrievers
-    _cached_retrievers = None
-
-
-def _create_specific_index(documents, index_path, data_name, embeddings):
-    """Fungsi helper untuk membuat satu indeks spesifik."""
-    if os.path.exists(index_path):
-        shutil.rmtree(index_path)
-        yield f"INFO: Direktori indeks lama untuk '{data_name}' di '{index_path}' telah dihapus.\n"
-        
-    if not documents:
-        yield f"INFO: Tidak ada data di '{data_name}' untuk diindeks. Melewati.\n"
+    """Call this after reindexing or deleting FAISS indexes to force a reload.
+
+    Generasi lama tetap melayani chat sampai generasi baru selesai dimuat di latar belakang
+    (di semua worker, lewat file generasi).
+    """
+    _registry.request_reload()
+
+
+@contextmanager
+def _index_write_lock():
+    os.makedirs(os.path.dirname(INDEX_WRITE_LOCK_FILE), exist_ok=True)
+    with open(INDEX_WRITE_LOCK_FILE, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _content_hash(document):
+    """Hash isi dan metadata sebuah dokumen untuk mendeteksi perubahan antar reindex."""
+    payload = json.dumps({"content": document.page_content, "metadata": document.metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(index_path):
+    """Membaca manifest {doc_id: {"hash", "ids"}} milik sebuah indeks, atau None jika tidak ada/rusak."""
+    manifest_path = os.path.join(index_path, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Peringatan: Manifest indeks '{index_path}' tidak bisa dibaca: {e}")
+        return None
+
+
+def _save_manifest(index_path, manifest):
+    manifest_path = os.path.join(index_path, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def _create_specific_index(documents, index_path, data_name, embeddings, full_rebuild=False, only_ids=None):
+    """Fungsi helper untuk memperbarui satu indeks spesifik secara inkremental.
+
+    Setiap record MongoDB (metadata 'doc_id') dicatat di manifest bersama hash kontennya
+    dan ID vektor FAISS miliknya. Hanya record baru/berubah yang di-embed ulang,
+    record yang dihapus dibuang dari indeks. full_rebuild=True memaksa bangun ulang total.
+    only_ids: documents hanya berisi record dengan ID ini (sinkronisasi parsial); ID yang
+    tidak ada di documents dianggap dihapus, record lain di indeks tidak disentuh.
+
+    documents boleh berupa generator: record dipecah saat dibaca lalu di-embed per batch
+    INDEXING_BATCH_CHUNKS potongan dan langsung ditambahkan ke indeks, jadi yang tertahan
+    di RAM hanya satu batch potongan + vektornya, bukan seluruh korpus.
+    File indeks ditulis atomik, jadi worker yang sedang melayani chat tetap membaca versi lama.
+    """
+    vector_store = None
+    manifest = None
+    if not full_rebuild and os.path.exists(index_path):
+        manifest = _load_manifest(index_path)
+        if manifest is not None:
+            try:
+                vector_store = load_store(index_path, embeddings, writable=True)
+            except Exception as e:
+                yield f"Peringatan: Gagal memuat indeks lama '{data_name}' ({e}). Membangun ulang penuh.\n"
+            if vector_store is None:
+                manifest = None
+
+    if vector_store is None and only_ids is not None:
+        yield f"Peringatan: Indeks '{data_name}' tidak dapat diperbarui sebagian. Jalankan Rebuild Index.\n"
         return
 
-    yield f"Memulai proses indexing untuk '{data_name}' ({len(documents)} dokumen)...\n"
-    
-    # Memecah dokumen menjadi chunks
+    if vector_store is None:
+        manifest = {}
+        if os.path.exists(index_path):
+            yield f"INFO: Indeks lama untuk '{data_name}' di '{index_path}' akan dibangun ulang penuh.\n"
+
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    texts = text_splitter.split_documents(documents)
-    yield f"Langkah 1/2: '{data_name}' dipecah menjadi {len(texts)} potongan.\n"
+    seen, stale_ids = set(), []
+    added = changed = embedded = 0
+    batch = []  # (chunk, chunk_id) yang menunggu di-embed
+    started = time.monotonic()
 
-    # Membuat embeddings dan menyimpan indeks
     try:
-        vector_store = FAISS.from_documents(texts, embeddings)
-        vector_store.save_local(index_path)
-        yield f"Langkah 2/2: Indeks '{data_name}' berhasil dibuat dan disimpan di '{index_path}'.\n"
+        with document_encoder() as encode:
+            # Langkah 1: bandingkan setiap record dengan manifest; pecah & embed hanya yang baru/berubah
+            for document in documents:
+                doc_id = document.metadata.get("doc_id") or document.metadata.get("source")
+                seen.add(doc_id)
+                content_hash = _content_hash(document)
+                entry = manifest.get(doc_id)
+                if entry is not None and entry["hash"] == content_hash:
+                    continue
+                if entry is not None:
+                    stale_ids.extend(entry["ids"])
+                    changed += 1
+                else:
+                    added += 1
+
+                chunks = text_splitter.split_documents([document])
+                chunk_ids = [f"{doc_id}:{content_hash[:12]}:{i}" for i in range(len(chunks))]
+                manifest[doc_id] = {"hash": content_hash, "ids": chunk_ids}
+                batch.extend(zip(chunks, chunk_ids))
+
+                if len(batch) >= INDEXING_BATCH_CHUNKS:
+                    vector_store = _append_batch(vector_store, index_path, embeddings, encode, batch)
+                    embedded += len(batch)
+                    batch = []
+                    elapsed = time.monotonic() - started
+                    yield f"  '{data_name}': {embedded} potongan di-embed ({embedded / elapsed:.1f} potongan/detik).\n"
+
+            if batch:
+                vector_store = _append_batch(vector_store, index_path, embeddings, encode, batch)
+                embedded += len(batch)
+                batch = []
+
+        if not seen and only_ids is None:
+            discard_store(vector_store)
+            if os.path.exists(index_path):
+                shutil.rmtree(index_path)
+            yield f"INFO: Tidak ada data di '{data_name}' untuk diindeks. Melewati.\n"
+            return
+
+        # Langkah 2: buang vektor milik record yang dihapus dan versi lama record yang berubah
+        if only_ids is None:
+            removed = [doc_id for doc_id in manifest if doc_id not in seen]
+        else:
+            removed = [doc_id for doc_id in only_ids if doc_id in manifest and doc_id not in seen]
+        for doc_id in removed:
+            stale_ids.extend(manifest.pop(doc_id)["ids"])
+
+        if not (removed or changed or added):
+            discard_store(vector_store)
+            yield f"INFO: '{data_name}' tidak berubah ({len(seen)} dokumen). Melewati.\n"
+            return
+
+        if stale_ids and vector_store is not None:
+            vector_store.delete(stale_ids)
+
+        elapsed = time.monotonic() - started
+        yield (f"'{data_name}': {added} baru, {changed} berubah, {len(removed)} dihapus (dari {len(seen)} dokumen); "
+               f"{embedded} potongan baru di-embed dalam {elapsed:.1f} detik, {len(stale_ids)} potongan lama dihapus.\n")
+
+        if vector_store is None or vector_store.index.ntotal == 0:
+            discard_store(vector_store)
+            if os.path.exists(index_path):
+                shutil.rmtree(index_path)
+            yield f"INFO: Indeks '{data_name}' kosong setelah pembaruan. Direktori dihapus.\n"
+            return
+
+        # Langkah 3: simpan indeks (dengan factory sumber ini jika sudah cukup besar) + manifest
+        factory = next((FAISS_INDEX_FACTORIES.get(key) for key, path, _ in SOURCES if path == index_path), None)
+        kind = save_store(vector_store, index_path, factory, FAISS_TRAIN_THRESHOLD)
+        _save_manifest(index_path, manifest)
+        yield f"Indeks '{data_name}' berhasil diperbarui ({vector_store.index.ntotal} potongan, {kind}) di '{index_path}'.\n"
+    except GeneratorExit:
+        # Job dibatalkan di tengah jalan: indeks di disk masih generasi lama yang utuh
+        discard_store(vector_store)
+        raise
     except Exception as e:
+        discard_store(vector_store)
+        # Manifest yang tidak sinkron lebih berbahaya daripada rebuild penuh berikutnya
+        if os.path.exists(os.path.join(index_path, MANIFEST_FILENAME)):
+            os.remove(os.path.join(index_path, MANIFEST_FILENAME))
         yield f"ERROR saat membuat indeks '{data_name}': {e}\n"
 
-def create_vector_db():
-    """Membuat atau memperbarui tiga vector store terpisah untuk semua tipe data."""
-    global _cached_retrievers
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-    # 1. Proses Indeks untuk Memory Bank
-    yield "\n--- MEMPROSES MEMORY BANK ---\n"
-    memory_docs = get_memory_documents_for_indexing()
-    yield from _create_specific_index(memory_docs, FAISS_MEMORY_PATH, "Memory Bank", embeddings)
-
-    # 2. Proses Indeks untuk Data Manual Teks
-    yield "\n--- MEMPROSES DATA TEKS MANUAL ---\n"
-    manual_text_docs = get_manual_text_documents_for_indexing()
-    yield from _create_specific_index(manual_text_docs, FAISS_MANUAL_TEXT_PATH, "Data Teks", embeddings)
-
-    # 3. Proses Indeks untuk Data Dokumen
-    yield "\n--- MEMPROSES DATA DOKUMEN ---\n"
-    document_docs = get_document_documents_for_indexing()
-    yield from _create_specific_index(document_docs, FAISS_DOCUMENT_PATH, "Data Dokumen", embeddings)
-
-    # 4. Proses Indeks untuk Data Scraping
-    yield "\n--- MEMPROSES DATA SCRAPING ---\n"
-    scraped_docs = get_scraped_documents_for_indexing()
-    yield from _create_specific_index(scraped_docs, FAISS_SCRAPED_PATH, "Data Scraping", embeddings)
-
-    # Invalidate cache so next chat loads fresh indexes
-    _cached_retrievers = None
+
+def _append_batch(vector_store, index_path, embeddings, encode, batch):
+    """Embed satu batch potongan lalu tambahkan ke store (dibuat saat batch pertama)."""
+    texts = [chunk.page_content for chunk, _ in batch]
+    vectors = encode(texts)
+    if vector_store is None:
+        vector_store = new_store(index_path, embeddings, len(vectors[0]))
+    vector_store.add_embeddings(
+        zip(texts, vectors),
+        metadatas=[chunk.metadata for chunk, _ in batch],
+        ids=[chunk_id for _, chunk_id in batch],
+    )
+    return vector_store
+
+
+def create_vector_db(full_rebuild=False):
+    """Membuat atau memperbarui empat vector store terpisah untuk semua tipe data.
+
+    Secara default hanya record yang berubah sejak reindex terakhir yang di-embed ulang.
+    Gunakan full_rebuild=True untuk membangun ulang semua indeks dari nol.
+    """
+    embeddings = get_embeddings()
+
+    with _index_write_lock():
+        yield from _create_all_indexes(embeddings, full_rebuild)
     yield "\nSemua proses indexing selesai.\n"
 
 
-def get_retrievers(k=3): # Tingkatkan k=3 untuk ingatan lebih komprehensif
-    """Memuat semua indeks FAISS yang ada dan mengembalikannya sebagai empat retriever terpisah.
-    
-    FIX #4: Results are cached at module level. FAISS.load_local is called once,
-    not on every chat request. Call invalidate_cache() to force a reload.
+def _create_all_indexes(embeddings, full_rebuild):
+    try:
+        # 1. Proses Indeks untuk Memory Bank
+        yield "\n--- MEMPROSES MEMORY BANK ---\n"
+        memory_docs = get_memory_documents_for_indexing()
+        yield from _create_specific_index(memory_docs, FAISS_MEMORY_PATH, "Memory Bank", embeddings, full_rebuild)
+
+        # 2. Proses Indeks untuk Data Manual Teks
+        yield "\n--- MEMPROSES DATA TEKS MANUAL ---\n"
+        manual_text_docs = get_manual_text_documents_for_indexing()
+        yield from _create_specific_index(manual_text_docs, FAISS_MANUAL_TEXT_PATH, "Data Teks", embeddings, full_rebuild)
+
+        # 3. Proses Indeks untuk Data Dokumen
+        yield "\n--- MEMPROSES DATA DOKUMEN ---\n"
+        document_docs = get_document_documents_for_indexing()
+        yield from _create_specific_index(document_docs, FAISS_DOCUMENT_PATH, "Data Dokumen", embeddings, full_rebuild)
+
+        # 4. Proses Indeks untuk Data Scraping
+        yield "\n--- MEMPROSES DATA SCRAPING ---\n"
+        scraped_docs = get_scraped_documents_for_indexing()
+        yield from _create_specific_index(scraped_docs, FAISS_SCRAPED_PATH, "Data Scraping", embeddings, full_rebuild)
+
+        if VECTOR_INDEX_MODE == "unified":
+            yield "\n--- MENYUSUN INDEKS GABUNGAN ---\n"
+            yield from _build_unified(embeddings, force=full_rebuild)
+    finally:
+        # Tandai generasi baru (juga jika dibatalkan di tengah: indeks yang sudah selesai tetap dipakai);
+        # worker memuatnya di latar belakang lalu menukarnya
+        invalidate_cache()
+
+
+def sync_indexes(changes):
+    """Menerapkan perubahan data ke indeks terkait tanpa rebuild penuh.
+
+    changes: {koleksi MongoDB: set ID record yang berubah, atau None untuk seluruh koleksi}.
+    Hanya record dengan ID tersebut yang dibaca dan di-embed ulang; None (mis. koleksi di-drop)
+    membandingkan seluruh koleksi dengan manifest seperti reindex inkremental biasa.
     """
-    global _cached_retrievers
-    
-    # Return cached retrievers if available
-    if _cached_retrievers is not None:
-        return _cached_retrievers
-
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    
-    retriever_memory, retriever_manual_text, retriever_document, retriever_scraped = None, None, None, None
-
-    # Muat Indeks Memory
-    if os.path.exists(FAISS_MEMORY_PATH):
+    targets = {}
+    for collection, ids in changes.items():
+        for key in COLLECTION_SOURCES.get(collection, []):
+            if ids is None or targets.get(key, set()) is None:
+                targets[key] = None
+            else:
+                targets.setdefault(key, set()).update(ids)
+    if not targets:
+        return
+
+    embeddings = get_embeddings()
+    with _index_write_lock():
         try:
-            db_memory = FAISS.load_local(FAISS_MEMORY_PATH, embeddings, allow_dangerous_deserialization=True)
-            retriever_memory = db_memory.as_retriever(search_kwargs={"k": k})
-        except Exception as e:
-            print(f"Peringatan: Gagal memuat indeks Memory Bank: {e}")
+            for key, index_path, data_name in SOURCES:
+                if key not in targets:
+                    continue
+                ids = targets[key]
+                if ids is None or _load_manifest(index_path) is None:
+                    yield from _create_specific_index(SOURCE_LOADERS[key](), index_path, data_name, embeddings)
+                else:
+                    yield from _create_specific_index(SOURCE_LOADERS[key](ids=sorted(ids)), index_path, data_name,
+                                                      embeddings, only_ids=ids)
+            if VECTOR_INDEX_MODE == "unified":
+                yield from _build_unified(embeddings)
+        finally:
+            invalidate_cache()
+
 
-    # Muat Indeks Manual Text
-    if os.path.exists(FAISS_MANUAL_TEXT_PATH):
+def _source_fingerprints():
+    """Sidik file vektor tiap indeks sumber; berubah setiap kali indeks itu ditulis ulang atau dihapus."""
+    fingerprints = {}
+    for key, index_path, _ in SOURCES:
         try:
-            db_manual_text = FAISS.load_local(FAISS_MANUAL_TEXT_PATH, embeddings, allow_dangerous_deserialization=True)
-            retriever_manual_text = db_manual_text.as_retriever(search_kwargs={"k": k})
-        except Exception as e:
-            print(f"Peringatan: Gagal memuat indeks Data Teks: {e}")
+            stat = os.stat(os.path.join(index_path, INDEX_FILENAME))
+            fingerprints[key] = [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            fingerprints[key] = None
+    return fingerprints
+
+
+def _build_unified(embeddings, force=False):
+    """Memperbarui indeks gabungan dari empat indeks per sumber.
 
-    # Muat Indeks Dokumen
-    if os.path.exists(FAISS_DOCUMENT_PATH):
+    Hanya sumber yang indeksnya ditulis ulang sejak penyusunan terakhir yang direkonstruksi; blok
+    sumber lain disalin dari indeks gabungan yang ada. Jika tidak ada yang berubah, tidak ada yang ditulis.
+    force=True (Rebuild Index) menyusun semua sumber dari awal.
+    """
+    try:
+        fingerprints = _source_fingerprints()
+        built_from = None if force else read_built_from(FAISS_UNIFIED_PATH)
+        if built_from == fingerprints:
+            yield "INFO: Indeks sumber tidak berubah sejak penyusunan terakhir; indeks gabungan tetap dipakai.\n"
+            return
+        split_stores, reuse = [], set()
+        for code, (key, index_path, _) in enumerate(SOURCES):
+            if built_from is not None and built_from.get(key) == fingerprints[key]:
+                reuse.add(code)
+            else:
+                # Vektor presisi penuh, bukan hasil rekonstruksi indeks terkompresi
+                split_stores.append((code, load_store(index_path, embeddings, master=True)))
         try:
-            db_document = FAISS.load_local(FAISS_DOCUMENT_PATH, embeddings, allow_dangerous_deserialization=True)
-            retriever_document = db_document.as_retriever(search_kwargs={"k": k})
+            total = build_unified_index(split_stores, FAISS_UNIFIED_PATH, fingerprints, reuse)
+        finally:
+            for _, store in split_stores:
+                close_store(store)
+        yield (f"Indeks gabungan berisi {total} potongan disimpan di '{FAISS_UNIFIED_PATH}' "
+               f"({len(split_stores)} sumber disusun ulang, {len(reuse)} disalin).\n")
+    except Exception as e:
+        yield f"ERROR saat menyusun indeks gabungan: {e}\n"
+
+
+def _load_generation():
+    """Memuat satu generasi indeks dari disk sesuai VECTOR_INDEX_MODE (dipanggil oleh registry)."""
+    if VECTOR_INDEX_MODE == "unified":
+        return _read_unified()
+    return _read_stores()
+
+
+def _read_stores():
+    embeddings = get_embeddings()
+    stores = {}
+    for key, index_path, data_name in SOURCES:
+        stores[key] = None
+        if os.path.exists(index_path):
+            try:
+                stores[key] = load_store(index_path, embeddings)
+            except Exception as e:
+                print(f"Peringatan: Gagal memuat indeks {data_name}: {e}")
+    return stores
+
+
+def _read_unified():
+    try:
+        return load_unified_index(FAISS_UNIFIED_PATH) or {}
+    except Exception as e:
+        print(f"Peringatan: Gagal memuat indeks gabungan: {e}")
+        return {}
+
+
+# --- FIX #4: Indeks dimuat sekali per generasi (vektor di-mmap, docstore SQLite), bukan per request ---
+# Setelah reindex, generasi baru dimuat di latar belakang dan ditukar secara atomik; cache jawaban dan
+# peta pertanyaan Memory Bank dikosongkan saat pertukaran karena berasal dari data generasi lama.
+def _on_generation_swap():
+    answer_cache.clear()
+    memory_lookup.invalidate()
+
+
+_registry = IndexRegistry(_load_generation, on_swap=_on_generation_swap)
+
+
+def _load_stores():
+    """Empat store FAISS (atau None per sumber) dari generasi indeks yang sedang aktif."""
+    return _registry.get()
+
+
+def get_retrievers(k=3): # Tingkatkan k=3 untuk ingatan lebih komprehensif
+    """Mengembalikan empat retriever terpisah (memory, teks manual, dokumen, scraping).
+
+    Dipertahankan untuk kompatibilitas; jalur chat memakai search_all() agar query
+    hanya di-embed sekali.
+    """
+    stores = _load_stores()
+    return tuple(
+        stores[key].as_retriever(search_kwargs={"k": k}) if stores[key] is not None else None
+        for key, _, _ in SOURCES
+    )
+
+
+def search_all(query, k=3, query_vector=None):
+    """Embed query satu kali lalu cari di setiap indeks yang termuat.
+
+    Mengembalikan dict berurutan sesuai prioritas SOURCES:
+    {key: None} jika indeks tidak tersedia, atau {key: {"docs": [...], "error": None}}.
+    query_vector boleh diberikan jika embedding query sudah dihitung sebelumnya.
+    """
+    if VECTOR_INDEX_MODE == "unified":
+        return _search_unified(query, k, query_vector)
+
+    stores = _load_stores()
+    results = {key: None for key, _, _ in SOURCES}
+    if not any(stores.values()):
+        return results
+
+    if query_vector is None:
+        try:
+            query_vector = run_blocking(get_embeddings().embed_query, query)
         except Exception as e:
-            print(f"Peringatan: Gagal memuat indeks Data Dokumen: {e}")
-            
-    # Muat Indeks Scraped
-    if os.path.exists(FAISS_SCRAPED_PATH):
+            for key, store in stores.items():
+                if store is not None:
+                    results[key] = {"docs": [], "error": e}
+            return results
+
+    # Keempat pencarian dijalankan bersamaan di pool thread bersama (FAISS melepas GIL saat search),
+    # lalu hasilnya dikumpulkan sesuai urutan prioritas dengan timeout per sumber dan deadline total.
+    # Batas waktu per sumber dihitung dari saat pencariannya dimulai, bukan dari saat mulai ditunggu,
+    # agar menunggu sumber prioritas lebih tinggi tidak memperpanjang batas sumber berikutnya.
+    executor = get_executor()
+    deadline = time.monotonic() + RETRIEVAL_DEADLINE_SECONDS
+    futures, source_deadlines = {}, {}
+    for key, _, _ in SOURCES:
+        if stores[key] is not None:
+            futures[key] = executor.submit(stores[key].similarity_search_by_vector, query_vector, k=k)
+            source_deadlines[key] = min(time.monotonic() + RETRIEVAL_SOURCE_TIMEOUT_SECONDS, deadline)
+    for key, _, data_name in SOURCES:
+        if key not in futures:
+            continue
+        timeout = max(0.0, source_deadlines[key] - time.monotonic())
         try:
-            db_scraped = FAISS.load_local(FAISS_SCRAPED_PATH, embeddings, allow_dangerous_deserialization=True)
-            retriever_scraped = db_scraped.as_retriever(search_kwargs={"k": k})
+            results[key] = {"docs": futures[key].result(timeout=timeout), "error": None}
+        except (FuturesTimeoutError, TimeoutError):
+            futures[key].cancel()
+            results[key] = {"docs": [], "error": TimeoutError(f"Pencarian {data_name} melebihi batas waktu")}
         except Exception as e:
-            print(f"Peringatan: Gagal memuat indeks Data Scraping: {e}")
-    
-    # Cache the result
-    _cached_retrievers = (retriever_memory, retriever_manual_text, retriever_document, retriever_scraped)
-    return _cached_retrievers
\ No newline at end of file
+            results[key] = {"docs": [], "error": e}
+    return results
+
+
+def _load_unified():
+    """Indeks gabungan dari generasi yang sedang aktif ({} jika belum dibangun)."""
+    return _registry.get()
+
+
+def _search_unified(query, k, query_vector):
+    """search_all() versi mode unified: satu pencarian atas matriks gabungan."""
+    unified = _load_unified()
+    source_keys = [key for key, _, _ in SOURCES]
+    if not unified:
+        return {key: None for key in source_keys}
+    try:
+        if query_vector is None:
+            query_vector = run_blocking(get_embeddings().embed_query, query)
+        return run_blocking(search_unified, unified, query_vector, k, source_keys, UNIFIED_SOURCE_WEIGHTS, UNIFIED_MAX_RESULTS)
+    except Exception as e:
+        return {key: {"docs": [], "error": e} for key in source_keys}
@@ -0,0 +1,127 @@
+"""Recall vs latensi tipe indeks FAISS dibandingkan baseline Flat (lihat FAISS_INDEX_FACTORIES).
+
+Memakai vektor sintetis berkelompok (dimensi all-MiniLM-L6-v2), atau vektor asli dari indeks
+yang sudah dibangun:
+
+    python benchmarks/index_factories.py --vectors 50000
+    python benchmarks/index_factories.py --index-path backend/db/faiss_index_scraped --output report.json
+
+Setiap factory dibangun dengan faiss_storage.build_serving_index() (kode yang sama dengan reindex),
+lalu diukur: waktu build+training, ukuran indeks, latensi per query (p50/p95) dan recall@k
+terhadap hasil Flat, untuk beberapa nilai nprobe (IVF) / efSearch (HNSW).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from faiss_storage import build_serving_index, INDEX_FILENAME, MASTER_INDEX_FILENAME  # noqa: E402
+
+DEFAULT_FACTORIES = "IVF{nlist},Flat;IVF{nlist},SQ8;IVF{nlist},PQ32;HNSW32;SQ8"
+SEARCH_SWEEPS = {"nprobe": [4, 16, 64], "efSearch": [32, 64, 128]}
+
+
+def synthetic_vectors(count, dim, clusters, seed):
+    """Vektor berkelompok (mirip embedding halaman dari beberapa topik), dinormalisasi seperti MiniLM."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def vectors_from_index(index_path):
+    master_file = os.path.join(index_path, MASTER_INDEX_FILENAME)
+    index = faiss.read_index(master_file if os.path.exists(master_file) else os.path.join(index_path, INDEX_FILENAME))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def sample_queries(vectors, count, seed):
+    """Query = vektor korpus acak + derau kecil (pertanyaan yang mirip dengan isi halaman)."""
+    rng = np.random.default_rng(seed + 1)
+    picks = vectors[rng.integers(0, len(vectors), size=count)]
+    queries = picks + 0.05 * rng.normal(size=picks.shape).astype(np.float32)
+    return np.ascontiguousarray(queries / np.linalg.norm(queries, axis=1, keepdims=True), dtype=np.float32)
+
+
+def measure(index, queries, k, ground_truth):
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = float(np.mean([len(set(f) & set(g)) / k for f, g in zip(found, ground_truth)]))
+    latencies = np.array(latencies) * 1000
+    return {
+        "recall_at_k": round(recall, 4),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-path", help="Direktori indeks FAISS yang sudah ada (default: vektor sintetis)")
+    parser.add_argument("--vectors", type=int, default=50000, help="Jumlah vektor sintetis")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=3, help="k retrieval (sama dengan search_all)")
+    parser.add_argument("--factories", default=DEFAULT_FACTORIES, help="Daftar factory FAISS, dipisah ';'")
+    parser.add_argument("--threads", type=int, default=1, help="Thread OpenMP FAISS (1 = seperti satu request)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Tulis hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    if args.index_path:
+        vectors = np.ascontiguousarray(vectors_from_index(args.index_path), dtype=np.float32)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim, args.clusters, args.seed)
+    queries = sample_queries(vectors, args.queries, args.seed)
+
+    start = time.perf_counter()
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    flat_build = time.perf_counter() - start
+    _, ground_truth = flat.search(queries, args.k)
+
+    results = [dict(factory="Flat", params={}, build_seconds=round(flat_build, 3),
+                    index_mb=round(faiss.serialize_index(flat).nbytes / 2**20, 2),
+                    **measure(flat, queries, args.k, ground_truth))]
+
+    for factory in [f.strip() for f in args.factories.split(";") if f.strip()]:
+        start = time.perf_counter()
+        index = build_serving_index(flat, factory)
+        build_seconds = round(time.perf_counter() - start, 3)
+        index_mb = round(faiss.serialize_index(index).nbytes / 2**20, 2)
+
+        space = faiss.ParameterSpace()
+        sweeps = [(name, values) for name, values in SEARCH_SWEEPS.items()
+                  if (name == "nprobe" and factory.startswith("IVF")) or (name == "efSearch" and factory.startswith("HNSW"))]
+        settings = [{name: value} for name, values in sweeps for value in values] or [{}]
+        for params in settings:
+            for name, value in params.items():
+                space.set_index_parameter(index, name, value)
+            results.append(dict(factory=factory, params=params, build_seconds=build_seconds, index_mb=index_mb,
+                                **measure(index, queries, args.k, ground_truth)))
+
+    print(f"{len(vectors)} vektor x {vectors.shape[1]} dim, {len(queries)} query, k={args.k}")
+    print(f"{'factory':<22}{'param':<16}{'build s':>9}{'MB':>9}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in results:
+        param = ",".join(f"{name}={value}" for name, value in row["params"].items())
+        print(f"{row['factory']:<22}{param:<16}{row['build_seconds']:>9}{row['index_mb']:>9}"
+              f"{row['recall_at_k']:>10}{row['latency_p50_ms']:>9}{row['latency_p95_ms']:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(vectors), "dim": int(vectors.shape[1]), "queries": len(queries), "k": args.k,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
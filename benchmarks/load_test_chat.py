@@ -0,0 +1,136 @@
+"""Load test untuk /api/chat: kapasitas request bersamaan per mode serving.
+
+Yang diukur adalah berapa banyak percakapan yang bisa menunggu LLM bersamaan, jadi jalur pintas
+(cache jawaban semantik dan fast path Memory Bank) harus dimatikan di server; jika tidak, hampir
+semua request setelah yang pertama hanya mengukur lookup cache. Jalankan server dua kali lalu
+bandingkan hasilnya:
+
+    cd backend
+    export LOAD_TEST_MODE=true RATELIMIT_ENABLED=false ANSWER_CACHE_ENABLED=false MEMORY_FAST_PATH_MODE=off
+    gunicorn app:app                       # gthread, 4 thread
+    SERVING_MODE=async gunicorn app:app    # gevent
+
+    python benchmarks/load_test_chat.py --url http://127.0.0.1:5000 --concurrency 1,4,16,64,128
+
+Tambahkan LLM_PROVIDER=stub (plus LLM_STUB_FIRST_TOKEN_MS / LLM_STUB_TOKENS_PER_SECOND) saat menjalankan
+server untuk menguji retrieval, penyusunan prompt dan streaming tanpa API key maupun kuota LLM.
+
+Sebagai pengaman tambahan, setiap request memakai pertanyaan unik dan riwayat satu giliran, sehingga
+tidak cocok persis dengan Memory Bank dan tidak memakai cache jawaban (yang hanya untuk pertanyaan
+pembuka). --first-turn-only mengirim pertanyaan tetap tanpa riwayat untuk mengukur jalur cache.
+
+Hasil acuan (1 worker, LLM_PROVIDER=stub dengan token pertama 1000 ms, 50 token/detik, 120 token ≈ 3,4 s
+per jawaban, 3 request per klien, 1 vCPU):
+
+    mode                 c=1                     c=16                     c=64
+    gthread (4 thread)   0,29 rps, p95 3,4 s     1,17 rps, p95 13,8 s     1,15 rps, p95 55,8 s
+    async (gevent)       0,28 rps, p95 3,6 s     4,54 rps, p95 3,5 s      17,88 rps, p95 3,6 s
+
+Hanya memakai standard library agar bisa dijalankan dari mesin mana pun.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_QUERIES = [
+    "Kapan PPDB dibuka?",
+    "Siapa kepala sekolah SMKN 2 Indramayu?",
+    "Jurusan apa saja yang ada di sekolah ini?",
+    "Di mana alamat sekolah?",
+    "Apa saja ekstrakurikuler yang tersedia?",
+]
+
+
+HISTORY = [
+    {"role": "user", "parts": [{"text": "Halo, saya calon siswa baru."}]},
+    {"role": "model", "parts": [{"text": "Halo! Ada yang bisa dibantu seputar SMKN 2 Indramayu?"}]},
+]
+
+
+def _send_chat(url, query, timeout, history):
+    body = json.dumps({"query": query, "history": history}).encode("utf-8")
+    req = urllib.request.Request(f"{url}/api/chat", data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status == 200
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_level(url, concurrency, requests_per_client, queries, timeout, first_turn_only=False):
+    """Jalankan `concurrency` klien paralel, masing-masing mengirim `requests_per_client` request."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def client(client_id):
+        nonlocal errors
+        for i in range(requests_per_client):
+            query = queries[(client_id + i) % len(queries)]
+            if first_turn_only:
+                ok, elapsed = _send_chat(url, query, timeout, [])
+            else:
+                ok, elapsed = _send_chat(url, f"{query} (klien {concurrency}-{client_id}-{i})", timeout, HISTORY)
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": concurrency * requests_per_client,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "latency_mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Daftar level konkurensi, dipisah koma")
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--label", default="", help="Nama run, mis. 'gthread' atau 'async'")
+    parser.add_argument("--first-turn-only", action="store_true",
+                        help="Pertanyaan tetap tanpa riwayat (mengukur jalur cache, bukan kapasitas LLM)")
+    parser.add_argument("--output", help="Tulis hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    results = []
+    for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+        result = run_level(args.url, level, args.requests_per_client, DEFAULT_QUERIES, args.timeout, args.first_turn_only)
+        results.append(result)
+        print(f"c={result['concurrency']:>4}  rps={result['throughput_rps']:>7}  "
+              f"p50={result['latency_p50_ms']:>8}ms  p95={result['latency_p95_ms']:>8}ms  errors={result['errors']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"label": args.label, "url": args.url, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""Benchmark jalur panas RAG dengan korpus sekolah sintetis (Bahasa Indonesia) yang reprodusibel.
+
+Korpus dibangkitkan dari template (PPDB, jurusan, ekstrakurikuler, guru, berita prestasi, tata tertib)
+dengan seed tetap, lalu dialirkan ke kode produksi yang sebenarnya:
+
+    build     create_vector_db(full_rebuild=True): waktu build, potongan/detik, ukuran indeks di disk
+    retrieval search_all(): latensi p50/p95/p99 dengan dan tanpa embedding query, recall@k tiap
+              indeks terhadap pencarian eksak (Flat atas vektor presisi penuh)
+    e2e       generate_response() lengkap dengan LLM_PROVIDER=stub (tanpa API key / kuota)
+    scraper   extract_single_page() atas halaman HTML sintetis (tanpa jaringan)
+
+Tidak menyentuh MongoDB maupun indeks di backend/db: semua file ditulis ke direktori kerja sementara.
+Hasil ditulis sebagai JSON (termasuk commit git) agar bisa dibandingkan antar commit:
+
+    python benchmarks/retrieval_suite.py --documents 2000 --output before.json
+    FAISS_INDEX_FACTORIES="scraped=IVF{nlist},SQ8" FAISS_TRAIN_THRESHOLD=0 \\
+        python benchmarks/retrieval_suite.py --documents 2000 --output after.json
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Benchmark tidak boleh menulis ke MongoDB produksi atau memicu job sinkronisasi indeks.
+# Nilai kosong (bukan dihapus) agar load_dotenv() di backend tidak mengisinya dari .env.
+os.environ["MONGO_URI"] = ""
+os.environ["INDEX_SYNC_MODE"] = "off"
+os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+
+import numpy as np  # noqa: E402
+import faiss  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+import vector_store  # noqa: E402
+from embedding_service import get_embeddings, EMBEDDING_MODEL_NAME  # noqa: E402
+from faiss_storage import load_store, close_store  # noqa: E402
+
+SECTIONS = ("build", "retrieval", "e2e", "scraper")
+# Porsi korpus per sumber (memory, teks manual, dokumen, scraping)
+SOURCE_SHARES = {"memory": 0.10, "manual_text": 0.20, "document": 0.10, "scraped": 0.60}
+
+JURUSAN = [
+    "Teknik Komputer dan Jaringan", "Rekayasa Perangkat Lunak", "Teknik Kendaraan Ringan",
+    "Teknik Pemesinan", "Teknik Instalasi Tenaga Listrik", "Teknik Pengelasan", "Kimia Industri",
+    "Akuntansi dan Keuangan Lembaga", "Desain Komunikasi Visual", "Teknik Audio Video",
+]
+EKSKUL = [
+    "Pramuka", "Paskibra", "PMR", "Rohis", "Futsal", "Bola Basket", "Tari Tradisional", "English Club",
+    "Robotik", "Karya Ilmiah Remaja", "Pencak Silat", "Paduan Suara", "Jurnalistik",
+]
+HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu"]
+BULAN = ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli", "Agustus", "September",
+         "Oktober", "November", "Desember"]
+NAMA = ["Ahmad", "Siti", "Budi", "Dewi", "Rizki", "Nur", "Agus", "Rina", "Dedi", "Lestari", "Yusuf", "Fitri",
+        "Hendra", "Wulan", "Bayu", "Intan"]
+MARGA = ["Hidayat", "Rahmawati", "Saputra", "Permana", "Kurniawan", "Susanti", "Nugraha", "Maulana"]
+MAPEL = ["Matematika", "Bahasa Indonesia", "Bahasa Inggris", "Pendidikan Pancasila", "Fisika", "Kimia",
+         "Produk Kreatif dan Kewirausahaan", "Dasar-Dasar Kejuruan", "Informatika", "Sejarah"]
+LOMBA = ["LKS tingkat provinsi", "LKS tingkat nasional", "O2SN", "FLS2N", "Olimpiade Sains Nasional",
+         "lomba debat Bahasa Inggris", "kompetisi robotik", "lomba karya tulis ilmiah"]
+JALUR_PPDB = ["afirmasi", "prestasi akademik", "prestasi non-akademik", "domisili", "perpindahan tugas orang tua"]
+FASILITAS = ["laboratorium komputer", "bengkel otomotif", "perpustakaan digital", "masjid sekolah",
+             "lapangan olahraga", "ruang praktik las", "teaching factory", "unit kesehatan sekolah"]
+PERUSAHAAN = ["PT Astra Honda Motor", "PT Pertamina RU VI Balongan", "PT Telkom Indonesia", "PT Polytron",
+              "PT Yamaha Indonesia", "Bank BJB", "PT PLN UP3 Cirebon"]
+
+
+def _nama(rng):
+    return f"{rng.choice(NAMA)} {rng.choice(MARGA)}"
+
+
+def _tahun(rng):
+    return rng.randint(2019, 2026)
+
+
+def _paragraf_jurusan(rng):
+    jurusan = rng.choice(JURUSAN)
+    return (f"Program keahlian {jurusan} dibuka dengan {rng.randint(2, 6)} rombongan belajar setiap tahun. "
+            f"Siswa mempelajari {rng.choice(MAPEL)} dan praktik di {rng.choice(FASILITAS)} selama "
+            f"{rng.randint(8, 24)} jam per minggu. Praktik kerja lapangan dilaksanakan di kelas XI selama "
+            f"{rng.randint(3, 6)} bulan, antara lain di {rng.choice(PERUSAHAAN)}. Ketua program keahlian saat ini "
+            f"adalah {_nama(rng)}, S.T.")
+
+
+def _paragraf_ekskul(rng):
+    ekskul = rng.choice(EKSKUL)
+    return (f"Ekstrakurikuler {ekskul} berlatih setiap hari {rng.choice(HARI)} pukul "
+            f"{rng.randint(13, 16)}.00 WIB di {rng.choice(FASILITAS)}. Pembina {ekskul} adalah {_nama(rng)}. "
+            f"Pada tahun {_tahun(rng)} anggota {ekskul} meraih juara {rng.randint(1, 3)} pada {rng.choice(LOMBA)}.")
+
+
+def _paragraf_ppdb(rng):
+    jalur = rng.choice(JALUR_PPDB)
+    bulan = rng.randrange(3, 7)
+    return (f"Pendaftaran PPDB jalur {jalur} tahun {_tahun(rng)} dibuka tanggal {rng.randint(1, 28)} "
+            f"{BULAN[bulan]} dan ditutup tanggal {rng.randint(1, 28)} {BULAN[bulan + 1]}. Kuota jalur {jalur} "
+            f"sebesar {rng.randint(5, 50)} persen dari daya tampung. Calon peserta didik wajib mengunggah kartu "
+            f"keluarga, rapor semester 1 sampai 5, dan surat keterangan sehat.")
+
+
+def _paragraf_guru(rng):
+    return (f"{_nama(rng)}, S.Pd. mengampu mata pelajaran {rng.choice(MAPEL)} untuk kelas {rng.choice(['X', 'XI', 'XII'])} "
+            f"{rng.choice(JURUSAN)} dan menjadi wali kelas sejak {_tahun(rng)}. Jadwal konsultasi orang tua "
+            f"setiap hari {rng.choice(HARI)} di ruang guru.")
+
+
+def _paragraf_tatib(rng):
+    return (f"Pasal {rng.randint(1, 40)}: siswa wajib hadir di sekolah paling lambat pukul 06.{rng.randint(30, 59)} WIB. "
+            f"Pada hari {rng.choice(HARI)} siswa mengenakan seragam {rng.choice(['putih abu-abu', 'batik', 'pramuka', 'praktik'])}. "
+            f"Pelanggaran ringan dikenakan {rng.randint(5, 25)} poin, dan akumulasi {rng.randint(50, 100)} poin "
+            f"berakibat pemanggilan orang tua.")
+
+
+PARAGRAF = [_paragraf_jurusan, _paragraf_ekskul, _paragraf_ppdb, _paragraf_guru, _paragraf_tatib]
+
+PERTANYAAN = [
+    lambda rng: f"Kapan pendaftaran PPDB jalur {rng.choice(JALUR_PPDB)} dibuka?",
+    lambda rng: f"Apa saja yang dipelajari di jurusan {rng.choice(JURUSAN)}?",
+    lambda rng: f"Kapan jadwal latihan ekstrakurikuler {rng.choice(EKSKUL)}?",
+    lambda rng: f"Siapa pembina {rng.choice(EKSKUL)}?",
+    lambda rng: f"Siapa guru {rng.choice(MAPEL)} kelas XI?",
+    lambda rng: f"Prestasi apa yang diraih siswa di {rng.choice(LOMBA)}?",
+    lambda rng: f"Di mana siswa {rng.choice(JURUSAN)} melakukan praktik kerja lapangan?",
+    lambda rng: f"Jam berapa siswa harus hadir di sekolah?",
+    lambda rng: f"Apa saja fasilitas {rng.choice(FASILITAS)} di sekolah?",
+]
+
+
+def synthetic_corpus(size, seed):
+    """{sumber: [Document]} dengan format metadata yang sama seperti *_documents_for_indexing()."""
+    rng = random.Random(seed)
+    counts = {key: max(1, int(size * share)) for key, share in SOURCE_SHARES.items()}
+    corpus = {key: [] for key in SOURCE_SHARES}
+
+    for i in range(counts["memory"]):
+        question = rng.choice(PERTANYAAN)(rng)
+        answer = rng.choice(PARAGRAF)(rng)
+        corpus["memory"].append(Document(
+            page_content=f"Pertanyaan: {question}\nJawaban Pasti: {answer}",
+            metadata={"source": f"Memory Bank: {question[:50]}...", "title": question, "type": "Memory Bank",
+                      "doc_id": f"memory-{i}"}))
+
+    for i in range(counts["manual_text"]):
+        title = f"Informasi {rng.choice(['Jurusan', 'Ekstrakurikuler', 'PPDB', 'Guru', 'Tata Tertib'])} #{i}"
+        content = "\n\n".join(rng.choice(PARAGRAF)(rng) for _ in range(rng.randint(1, 3)))
+        corpus["manual_text"].append(Document(
+            page_content=f"Judul Informasi Teks: {title}\n\nKonten:\n{content}",
+            metadata={"source": "Input Manual", "title": title, "type": "Data Teks", "doc_id": f"manual-{i}"}))
+
+    for i in range(counts["document"]):
+        # Dokumen unggahan panjang: dipecah menjadi beberapa potongan oleh text splitter
+        title = f"{rng.choice(['Kalender Akademik', 'Peraturan Tata Tertib', 'Panduan PPDB', 'Profil Sekolah'])} {_tahun(rng)}"
+        content = "\n\n".join(rng.choice(PARAGRAF)(rng) for _ in range(rng.randint(6, 16)))
+        corpus["document"].append(Document(
+            page_content=f"Judul Dokumen: {title}\n\nIsi Dokumen:\n{content}",
+            metadata={"source": f"{title}.pdf", "title": title, "type": "Data Dokumen", "doc_id": f"document-{i}"}))
+
+    for i in range(counts["scraped"]):
+        lomba = rng.choice(LOMBA)
+        title = f"Siswa {rng.choice(JURUSAN)} Raih Juara {rng.randint(1, 3)} {lomba.title()}"
+        url = f"https://smkn2-im.sch.id/berita/{i}"
+        image_url = f"https://smkn2-im.sch.id/wp-content/uploads/berita-{i}.jpg"
+        content = "\n\n".join(rng.choice(PARAGRAF)(rng) for _ in range(rng.randint(2, 6)))
+        corpus["scraped"].append(Document(
+            page_content=(f"Judul Halaman: {title}\nURL: {url}\nURL Gambar Terkait: {image_url}\n\nKonten:\n{content}"),
+            metadata={"source": url, "title": title, "type": "Data Scrap", "image_url": image_url,
+                      "doc_id": f"scraped-{i}"}))
+    return corpus
+
+
+def synthetic_queries(count, seed):
+    rng = random.Random(seed + 1)
+    return [rng.choice(PERTANYAAN)(rng) for _ in range(count)]
+
+
+def synthetic_html(document):
+    """Halaman berita lengkap dengan boilerplate (menu, sidebar, footer) di sekitar artikel."""
+    paragraphs = document.page_content.split("Konten:\n", 1)[-1].split("\n\n")
+    body = "".join(f"<p>{p}</p>" for p in paragraphs)
+    menu = "".join(f'<li><a href="/jurusan/{j}">{j}</a></li>' for j in JURUSAN)
+    return (f'<!DOCTYPE html><html lang="id"><head><title>{document.metadata["title"]}</title>'
+            f'<meta property="og:image" content="{document.metadata["image_url"]}"></head><body>'
+            f'<header><img src="/logo.png" width="40"><nav><ul>{menu}</ul></nav></header>'
+            f'<div class="content"><article><h1>{document.metadata["title"]}</h1>{body}'
+            f'<img src="/uploads/foto-kegiatan.jpg" width="640"></article></div>'
+            f'<aside class="sidebar"><div class="widget"><ul>{menu}</ul></div></aside>'
+            f'<footer>SMK Negeri 2 Indramayu - Jl. Pahlawan, Indramayu</footer>'
+            f'<script>var tracking = 1;</script></body></html>')
+
+
+def _percentiles_ms(seconds):
+    values = np.array(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def rss_mb():
+    """RSS proses saat ini (Linux), atau puncak RSS jika /proc tidak tersedia."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _dir_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return round(total / 2**20, 2)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_build(corpus):
+    # Korpus sintetis menggantikan loader MongoDB; selebihnya jalur reindex produksi apa adanya
+    loader_names = {
+        "memory": "get_memory_documents_for_indexing",
+        "manual_text": "get_manual_text_documents_for_indexing",
+        "document": "get_document_documents_for_indexing",
+        "scraped": "get_scraped_documents_for_indexing",
+    }
+    for key, name in loader_names.items():
+        setattr(vector_store, name, lambda ids=None, key=key: iter(corpus[key]))
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    log = [line.strip() for line in vector_store.create_vector_db(full_rebuild=True) if line.strip()]
+    build_seconds = time.perf_counter() - start
+    errors = [line for line in log if line.startswith("ERROR")]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+    chunks, indexes = 0, {}
+    for key, index_path, _ in vector_store.SOURCES:
+        store = load_store(index_path, get_embeddings())
+        indexes[key] = {"documents": len(corpus[key]), "chunks": store.index.ntotal,
+                        "index_type": type(store.index).__name__, "disk_mb": _dir_mb(index_path)}
+        chunks += store.index.ntotal
+        close_store(store)
+    return {
+        "seconds": round(build_seconds, 3),
+        "chunks_per_second": round(chunks / build_seconds, 1),
+        "chunks": chunks,
+        "indexes": indexes,
+        "rss_delta_mb": round(rss_mb() - rss_before, 1) if rss_before is not None else None,
+    }
+
+
+def _exact_recall(query_vectors, k):
+    """recall@k indeks serving tiap sumber terhadap pencarian eksak atas vektor presisi penuh."""
+    embeddings = get_embeddings()
+    recall = {}
+    for key, index_path, _ in vector_store.SOURCES:
+        serving = load_store(index_path, embeddings)
+        master = load_store(index_path, embeddings, master=True)
+        try:
+            exact = faiss.IndexFlatL2(master.index.d)
+            exact.add(master.index.reconstruct_n(0, master.index.ntotal))
+            kk = min(k, exact.ntotal)
+            _, truth = exact.search(query_vectors, kk)
+            _, found = serving.index.search(query_vectors, kk)
+            recall[key] = round(float(np.mean([len(set(f) & set(t)) / kk for f, t in zip(found, truth)])), 4)
+        finally:
+            close_store(serving)
+            close_store(master)
+    return recall
+
+
+def bench_retrieval(queries, k):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    vector_store._load_stores()  # pemuatan dingin generasi indeks (registry)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    embeddings = get_embeddings()
+    query_vectors = embeddings.embed_documents(queries)
+
+    with_embedding, search_only, empty = [], [], 0
+    for query, query_vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        vector_store.search_all(query, k=k)
+        with_embedding.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = vector_store.search_all(query, k=k, query_vector=query_vector)
+        search_only.append(time.perf_counter() - start)
+        if not any(result and result["docs"] for result in results.values()):
+            empty += 1
+
+    return {
+        "mode": vector_store.VECTOR_INDEX_MODE,
+        "queries": len(queries),
+        "k": k,
+        "load_seconds": round(load_seconds, 3),
+        "search_all": _percentiles_ms(with_embedding),
+        "search_all_precomputed_vector": _percentiles_ms(search_only),
+        "queries_without_results": empty,
+        "recall_at_k": _exact_recall(np.ascontiguousarray(query_vectors, dtype=np.float32), k),
+        "rss_loaded_delta_mb": round(rss_loaded - rss_before, 1) if rss_before is not None else None,
+    }
+
+
+def bench_e2e(queries, args):
+    # Penyedia LLM stub lokal (llm_providers.StubProvider) dikonfigurasi lewat env sebelum app diimpor
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["LLM_STUB_FIRST_TOKEN_MS"] = str(args.llm_first_token_ms)
+    os.environ["LLM_STUB_ANSWER_TOKENS"] = str(args.llm_tokens)
+    os.environ["LLM_STUB_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+    import app  # setelah indeks sintetis ada: tidak memicu auto-reindex saat import
+
+    totals, first_tokens, retrieval, prompt_tokens, errors = [], [], [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        first_token = retrieved = None
+        for step in app.generate_response(query, [], use_cache=False):
+            now = time.perf_counter() - start
+            if step["step"] == "final_prompt" and retrieved is None:
+                retrieved = now
+            elif step["step"] == "answer_delta" and first_token is None:
+                first_token = now
+            elif step["step"] == "token_usage":
+                prompt_tokens.append(step["data"]["prompt"])
+            elif step["step"] == "error":
+                errors += 1
+        totals.append(time.perf_counter() - start)
+        if first_token is not None:
+            first_tokens.append(first_token)
+        if retrieved is not None:
+            retrieval.append(retrieved)
+
+    return {
+        "queries": len(queries),
+        "errors": errors,
+        "llm": {"first_token_ms": args.llm_first_token_ms, "tokens": args.llm_tokens,
+                "tokens_per_second": args.llm_tokens_per_second},
+        "total": _percentiles_ms(totals),
+        "until_prompt": _percentiles_ms(retrieval) if retrieval else None,
+        "first_token": _percentiles_ms(first_tokens) if first_tokens else None,
+        "prompt_tokens_mean": round(float(np.mean(prompt_tokens)), 1) if prompt_tokens else None,
+    }
+
+
+def bench_scraper(documents):
+    import scraper
+
+    pages = {doc.metadata["source"]: synthetic_html(doc) for doc in documents}
+
+    def fake_fetch(url, **kwargs):
+        html = pages[url]
+        return SimpleNamespace(text=html, content=html.encode("utf-8"), status_code=200, headers={},
+                               encoding="utf-8", apparent_encoding="utf-8", raise_for_status=lambda: None)
+
+    # Hanya ekstraksi yang diukur: jaringan, batas laju per host dan resolusi DNS (is_safe_url) dilewati
+    original_fetch, original_is_safe = scraper.fetch_url, scraper.is_safe_url
+    scraper.fetch_url, scraper.is_safe_url = fake_fetch, lambda url: True
+    try:
+        timings, statuses = [], {}
+        for url in pages:
+            start = time.perf_counter()
+            result = scraper.extract_single_page(url)
+            timings.append(time.perf_counter() - start)
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    finally:
+        scraper.fetch_url, scraper.is_safe_url = original_fetch, original_is_safe
+
+    return {
+        "pages": len(pages),
+        "pages_per_second": round(len(pages) / sum(timings), 1),
+        "statuses": statuses,
+        "extract_single_page": _percentiles_ms(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000, help="Jumlah record korpus sintetis (semua sumber)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3, help="k retrieval (sama dengan search_all)")
+    parser.add_argument("--e2e-queries", type=int, default=50, help="Jumlah pertanyaan untuk generate_response()")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0, help="Latensi token pertama LLM stub")
+    parser.add_argument("--llm-tokens", type=int, default=120, help="Panjang jawaban LLM stub (token)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="0 = tanpa jeda antar token")
+    parser.add_argument("--scraper-pages", type=int, default=100)
+    parser.add_argument("--sections", default=",".join(SECTIONS), help="Bagian yang dijalankan, dipisah koma")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Direktori kerja indeks (default: direktori sementara, dihapus di akhir)")
+    parser.add_argument("--output", help="Tulis hasil sebagai JSON ke file ini")
+    args = parser.parse_args()
+
+    sections = [s.strip() for s in args.sections.split(",") if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"Bagian tidak dikenal: {', '.join(sorted(unknown))}")
+    if ("retrieval" in sections or "e2e" in sections) and "build" not in sections:
+        parser.error("Bagian 'retrieval' dan 'e2e' memerlukan 'build'")
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="damayai-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # path indeks di vector_store relatif terhadap direktori kerja ("db/...")
+
+    corpus = synthetic_corpus(args.documents, args.seed)
+    queries = synthetic_queries(args.queries, args.seed)
+    report = {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "index_factories": vector_store.FAISS_INDEX_FACTORIES,
+        "seed": args.seed,
+        "documents": {key: len(docs) for key, docs in corpus.items()},
+    }
+
+    try:
+        start = time.perf_counter()
+        get_embeddings()
+        report["embedding_load_seconds"] = round(time.perf_counter() - start, 3)
+        report["rss_baseline_mb"] = rss_mb()
+
+        if "build" in sections:
+            report["build"] = bench_build(corpus)
+            print(f"build: {report['build']['chunks']} potongan dalam {report['build']['seconds']} s "
+                  f"({report['build']['chunks_per_second']} potongan/detik)")
+        if "retrieval" in sections:
+            report["retrieval"] = bench_retrieval(queries, args.k)
+            r = report["retrieval"]
+            print(f"retrieval: search_all p50={r['search_all']['p50_ms']}ms p95={r['search_all']['p95_ms']}ms "
+                  f"p99={r['search_all']['p99_ms']}ms, tanpa embedding p50={r['search_all_precomputed_vector']['p50_ms']}ms, "
+                  f"recall@{args.k}={r['recall_at_k']}")
+        if "e2e" in sections:
+            report["e2e"] = bench_e2e(queries[:args.e2e_queries], args)
+            e = report["e2e"]
+            print(f"e2e: generate_response p50={e['total']['p50_ms']}ms p95={e['total']['p95_ms']}ms "
+                  f"p99={e['total']['p99_ms']}ms, errors={e['errors']}")
+        if "scraper" in sections:
+            report["scraper"] = bench_scraper(corpus["scraped"][:args.scraper_pages])
+            s = report["scraper"]
+            print(f"scraper: {s['pages_per_second']} halaman/detik, p50={s['extract_single_page']['p50_ms']}ms, "
+                  f"status={s['statuses']}")
+        report["rss_final_mb"] = rss_mb()
+        report["rss_peak_mb"] = peak_rss_mb()
+    finally:
+        if not args.workdir:
+            os.chdir(tempfile.gettempdir())
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const reindexBtn = document.getElementById('reindex-btn');
     const consoleDiv = document.getElementById('console');
     const statusSpan = document.getElementById('status');
+    const cancelJobBtn = document.getElementById('cancel-job-btn');
 
     // Sidebar & Navigation
     const sidebar = document.getElementById('admin-sidebar');
@@ -252,6 +253,21 @@ document.addEventListener('DOMContentLoaded', () => {
         statusSpan.innerHTML = `<i class="fas fa-circle" style="font-size:0.5rem;"></i> ${text}`;
     }
 
+    function appendConsoleLine(line) {
+        const p = document.createElement('p');
+        p.textContent = `> ${line}`;
+        if (line.toLowerCase().includes('error')) p.style.color = '#f87171';
+        else if (line.toLowerCase().includes('success') || line.toLowerCase().includes('berhasil')) p.style.color = '#4ade80';
+        else p.style.color = 'var(--text-secondary)';
+        consoleDiv.appendChild(p);
+    }
+
+    const JOB_FINAL_STATUSES = ['succeeded', 'failed', 'cancelled', 'lost'];
+    const JOB_POLL_INTERVAL_MS = 1000;
+    let currentJobId = null;
+
+    // Scraping/crawling/reindex berjalan sebagai job di server; halaman ini hanya memantau lognya,
+    // jadi menutup tab tidak menghentikan proses.
     async function runProcess(endpoint, processName, customPayload = null) {
         if(scrapeBtn) scrapeBtn.disabled = true;
         if(reindexBtn) reindexBtn.disabled = true;
@@ -261,6 +277,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (statusSpan) setStatusBadge(processName, 'running');
         if (consoleDiv) consoleDiv.innerHTML = `<p style="color:#facc15;">&gt; Memulai proses ${processName}...</p>`;
 
+        let finalStatus = 'failed';
         try {
             let options = { method: 'POST' };
             if (customPayload) {
@@ -268,27 +285,28 @@ document.addEventListener('DOMContentLoaded', () => {
                 options.body = JSON.stringify(customPayload);
             }
             const response = await apiFetch(endpoint, options);
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            const result = await response.json();
+            if (!response.ok || !result.job_id) throw new Error(result.message || `HTTP error! status: ${response.status}`);
 
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
+            currentJobId = result.job_id;
+            if (cancelJobBtn) cancelJobBtn.style.display = 'inline-flex';
+            if (result.message) appendConsoleLine(result.message);
 
+            let since = 0;
             while (true) {
-                const { done, value } = await reader.read();
-                if (done) break;
-
-                const chunk = decoder.decode(value, { stream: true });
-                const lines = chunk.split('\n').filter(line => line.trim() !== '');
-
-                lines.forEach(line => {
-                    const p = document.createElement('p');
-                    p.textContent = `> ${line}`;
-                    if (line.toLowerCase().includes('error')) p.style.color = '#f87171';
-                    else if (line.toLowerCase().includes('success') || line.toLowerCase().includes('berhasil')) p.style.color = '#4ade80';
-                    else p.style.color = 'var(--text-secondary)';
-                    consoleDiv.appendChild(p);
-                });
+                const jobResp = await apiFetch(`/api/jobs/${currentJobId}?since=${since}`);
+                if (!jobResp.ok) throw new Error(`HTTP error! status: ${jobResp.status}`);
+                const { job } = await jobResp.json();
+
+                job.logs.forEach(appendConsoleLine);
                 consoleDiv.scrollTop = consoleDiv.scrollHeight;
+                since = job.next_since;
+
+                if (JOB_FINAL_STATUSES.includes(job.status)) {
+                    finalStatus = job.status;
+                    break;
+                }
+                await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
             }
 
         } catch (error) {
@@ -299,16 +317,19 @@ document.addEventListener('DOMContentLoaded', () => {
                 consoleDiv.appendChild(p);
             }
         } finally {
+            currentJobId = null;
+            if (cancelJobBtn) cancelJobBtn.style.display = 'none';
             if(scrapeBtn) scrapeBtn.disabled = false;
             if(reindexBtn) reindexBtn.disabled = false;
             const crawlBtn = document.getElementById('crawl-btn');
             if (crawlBtn) crawlBtn.disabled = false;
 
-            if (statusSpan) setStatusBadge('Selesai', 'done');
+            const statusLabels = { succeeded: 'Selesai', cancelled: 'Dibatalkan', lost: 'Terputus', failed: 'Gagal' };
+            if (statusSpan) setStatusBadge(statusLabels[finalStatus] || 'Selesai', 'done');
             if (consoleDiv) {
                 const p = document.createElement('p');
                 p.style.color = '#facc15';
-                p.textContent = `> Proses ${processName} Selesai.`;
+                p.textContent = `> Proses ${processName} ${statusLabels[finalStatus] || 'Selesai'}.`;
                 consoleDiv.appendChild(p);
                 consoleDiv.scrollTop = consoleDiv.scrollHeight;
             }
@@ -317,6 +338,19 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    if (cancelJobBtn) {
+        cancelJobBtn.addEventListener('click', async () => {
+            if (!currentJobId || !confirm('Batalkan proses yang sedang berjalan?')) return;
+            try {
+                const response = await apiFetch(`/api/jobs/${currentJobId}/cancel`, { method: 'POST' });
+                const result = await response.json();
+                appendConsoleLine(result.message);
+            } catch (error) {
+                appendConsoleLine(`Error: ${error.message}`);
+            }
+        });
+    }
+
     async function performAction(endpoint, message) {
         alert(message);
         try {
@@ -451,16 +451,57 @@
             try {
                 const resp = await fetch(`${WIDGET_BASE_URL}/api/chat`, {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
+                    headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
                     body: JSON.stringify({
                         query: text,
-                        history: this.chatHistory.slice(-20)
+                        history: this.chatHistory.slice(-20),
+                        stream: true
                     })
                 });
                 if (!resp.ok) throw new Error('Server error');
-                const data = await resp.json();
-                this.chatHistory.push({ role: 'model', parts: [{ text: data.response }] });
-                this.appendMessage(data.response, 'ai');
+
+                let answer = '';
+                const contentType = resp.headers.get('Content-Type') || '';
+                if (contentType.includes('application/x-ndjson') && resp.body) {
+                    // Tampilkan token jawaban segera setelah diterima
+                    let bubble = null;
+                    const render = () => {
+                        if (!bubble) {
+                            this.hideTyping();
+                            bubble = this.appendMessage('', 'ai');
+                        }
+                        bubble.innerHTML = this.formatMessage(answer);
+                        this.scrollToBottom();
+                    };
+                    const reader = resp.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+                        const lines = buffer.split('\n');
+                        buffer = lines.pop();
+                        for (const line of lines) {
+                            if (!line.trim()) continue;
+                            const event = JSON.parse(line);
+                            if (event.step === 'answer_delta') {
+                                answer += event.data;
+                                render();
+                            } else if (event.step === 'final_answer') {
+                                answer = event.data;
+                                render();
+                            } else if (event.step === 'error') {
+                                throw new Error(event.data);
+                            }
+                        }
+                    }
+                } else {
+                    const data = await resp.json();
+                    answer = data.response;
+                    this.appendMessage(answer, 'ai');
+                }
+                this.chatHistory.push({ role: 'model', parts: [{ text: answer }] });
             } catch (err) {
                 this.appendMessage('Maaf, terjadi kesalahan. Silakan coba lagi nanti.', 'ai');
             } finally {
@@ -542,6 +583,7 @@
 
             this.messagesArea.appendChild(msg);
             this.scrollToBottom();
+            return msg.querySelector('.damayai-bubble');
         }
 
         scrollToBottom() {